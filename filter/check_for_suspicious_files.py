@@ -1,22 +1,10 @@
 import os
+import sys
 import shutil
 
-
-allowed_tokens = {"person1", "proper1", "number1"}
-slovenian_chars = set("abcčdefghijklmnoprsštuvzž")  
-
-
-def is_valid_lemma(lemma):
-    """Check if lemma is either an allowed token or pure Slovenian"""
-    # Check for allowed special tokens
-    if lemma in allowed_tokens:
-        return True
-    
-    # Must contain only slovenian letters
-    if not all(c in slovenian_chars for c in lemma.lower()):
-        return False
-    
-    return True
+# Shared validator lives next to make_corpus.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'preprocessing'))
+from slovenian_lemmas import invalid_lemmas
 
 
 def check_file(filepath):
@@ -27,11 +15,7 @@ def check_file(filepath):
     lemmas = [lem for lem in content.split() if lem]
 
     total_lemmas = len(lemmas)
-    suspicious_lemmas = set()
-
-    for lemma in lemmas:
-        if not is_valid_lemma(lemma):
-            suspicious_lemmas.add(lemma)
+    suspicious_lemmas = invalid_lemmas(lemmas)
     
     invalid_ratio = len(suspicious_lemmas) / total_lemmas if total_lemmas > 0 else 0
     return suspicious_lemmas, invalid_ratio, total_lemmas
@@ -0,0 +1,49 @@
+import os
+import sys
+from collections import Counter
+
+from frequency_analysis import find_rare_words, save_rare_words, save_word_stats
+from filter_corpus_freguency import filter_corpus
+
+# Corpus building is shared with make_corpus.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'preprocessing'))
+from make_corpus import process_files
+
+
+def build_corpus(source_folder, corpus_file, binary_prefix=None):
+    """First pass: make_corpus.py process_files, counting words on the way"""
+    word_counts = Counter()
+    doc_frequency = Counter()  # How many texts contain each word
+    process_files(source_folder, corpus_file, binary_prefix, word_counts, doc_frequency)
+    return word_counts, doc_frequency
+
+
+def run_pipeline(source_folder, output_dir, rare_threshold=2,
+                 corpus_name='slovenian_corpus.txt',
+                 filtered_name='filtered_slovenian_corpus.txt', binary_name='slovenian_corpus'):
+    '''
+    Same outputs as make_corpus.py -> frequency_analysis.py -> filter_corpus_freguency.py
+    in two streaming passes: corpus (and its binary version, binary_name=None - without),
+    word_stats.tsv, rare_words.tsv and filtered corpus
+
+    rare_threshold - words appearing in <= rare_threshold texts are removed
+    '''
+    os.makedirs(output_dir, exist_ok=True)
+    corpus_file = os.path.join(output_dir, corpus_name)
+
+    binary_prefix = os.path.join(output_dir, binary_name) if binary_name else None
+    word_counts, doc_frequency = build_corpus(source_folder, corpus_file, binary_prefix)
+    print(f"Total words: {sum(word_counts.values()):,}")
+    print(f"Unique words: {len(word_counts):,}")
+
+    save_word_stats(word_counts, doc_frequency, os.path.join(output_dir, 'word_stats.tsv'))
+    rare_words = find_rare_words(word_counts, doc_frequency, rare_threshold)
+    save_rare_words(rare_words, os.path.join(output_dir, 'rare_words.tsv'))
+    print(f"Found {len(rare_words):,} rare words (in <= {rare_threshold} texts)")
+
+    # Second pass: remove rare words
+    filter_corpus(corpus_file, os.path.join(output_dir, filtered_name), rare_words)
+
+
+if __name__ == '__main__':
+    run_pipeline("annotated corpora + dglib", "corpus", rare_threshold=2)
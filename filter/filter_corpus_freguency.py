@@ -31,4 +31,5 @@ def process_corpus(rare_words_file, input_corpus_file, output_corpus_file):
     
 
 
-process_corpus('rare_words.tsv', 'slovenian_corpus.txt', 'filtered_slovenian_corpus.txt')
\ No newline at end of file
+if __name__ == '__main__':
+    process_corpus('rare_words.tsv', 'slovenian_corpus.txt', 'filtered_slovenian_corpus.txt')
\ No newline at end of file
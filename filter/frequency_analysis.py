@@ -1,48 +1,121 @@
 import os
+import sys
 from collections import Counter
+from multiprocessing import Pool
 import matplotlib.pyplot as plt
 
+# Binary corpus reader lives next to make_corpus.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'preprocessing'))
+from binary_corpus import count_frequencies
 
-def analyze_corpus(corpus_path, output_dir, rare_threshold=2):
-    """Analyze corpus with 4,323 texts, optimized for medium-sized collections"""
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Load and count all words
-    with open(corpus_path, 'r', encoding='utf-8') as f:
-        texts = [line.strip().split() for line in f]
-    
+
+def shard_ranges(corpus_path, shards):
+    """Split file into byte ranges, every text (line) belongs to the range where it starts"""
+    size = os.path.getsize(corpus_path)
+    bounds = [size * i // shards for i in range(shards + 1)]
+    return [(corpus_path, start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def count_shard(shard):
+    """Count words and document frequencies of texts starting in [start, end)"""
+    corpus_path, start, end = shard
+    texts = 0
+    word_counts = Counter()
+    doc_frequency = Counter()
+
+    with open(corpus_path, 'rb') as f:
+        if start:
+            # Skip the text started in the previous shard
+            f.seek(start - 1)
+            f.readline()
+        position = f.tell()
+
+        while position < end:
+            line = f.readline()
+            if not line:
+                break
+            position += len(line)
+            words = line.decode('utf-8').split()
+            texts += 1
+            word_counts.update(words)
+            doc_frequency.update(set(words))  # once per text
+
+    return texts, word_counts, doc_frequency
+
+
+def count_words(corpus_path, workers=None):
+    """Count words and document frequencies of the corpus in parallel shards
+
+    Partial counts are merged in shard order, so the result (and order of
+    words with equal counts) is the same as counting the texts one by one.
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shard_ranges(corpus_path, workers * 4)  # Smaller shards balance the workers
+
+    texts = 0
     word_counts = Counter()
     doc_frequency = Counter()  # How many texts contain each word
+
+    with Pool(workers) as pool:
+        for shard_texts, shard_counts, shard_frequency in pool.imap(count_shard, shards):
+            texts += shard_texts
+            word_counts.update(shard_counts)
+            doc_frequency.update(shard_frequency)
+
+    return texts, word_counts, doc_frequency
+
+
+def save_word_stats(word_counts, doc_frequency, path):
+    """Save counts and document frequencies of all words, most common first"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("word\tcount\tdocument_frequency\n")
+        for word, count in word_counts.most_common():
+            f.write(f"{word}\t{count}\t{doc_frequency[word]}\n")
+
+
+def find_rare_words(word_counts, doc_frequency, rare_threshold):
+    """Get words appearing in <= rare_threshold texts with their (count, document frequency)"""
+    return {word: (count, doc_frequency[word]) 
+            for word, count in word_counts.items() 
+            if doc_frequency[word] <= rare_threshold}
+
+
+def save_rare_words(rare_words, path):
+    """Save rare words sorted by document frequency and count"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("word\tcount\tdocument_frequency\n")
+        for word, (count, df) in sorted(rare_words.items(), key=lambda x: (x[1][1], x[1][0])):
+            f.write(f"{word}\t{count}\t{df}\n")
+
+
+def analyze_corpus(corpus_path, output_dir, rare_threshold=2, workers=None, binary_prefix=None):
+    """Analyze corpus with 4,323 texts, optimized for medium-sized collections"""
+    os.makedirs(output_dir, exist_ok=True)
     
-    for words in texts:
-        word_counts.update(words)
-        doc_frequency.update(set(words))  # once per text
+    if binary_prefix:
+        # Binary version of the corpus (make_corpus.py), no text to split
+        texts, word_counts, doc_frequency = count_frequencies(binary_prefix)
+    else:
+        # Count all words streaming the corpus in parallel
+        texts, word_counts, doc_frequency = count_words(corpus_path, workers)
     
     total_words = sum(word_counts.values())
     unique_words = len(word_counts)
     
-    print(f"Analyzed {len(texts):,} texts")
+    print(f"Analyzed {texts:,} texts")
     print(f"Total words: {total_words:,}")
     print(f"Unique words: {unique_words:,}")
     
     # Save complete frequencies
-    with open(os.path.join(output_dir, 'word_stats.tsv'), 'w', encoding='utf-8') as f:
-        f.write("word\tcount\tdocument_frequency\n")
-        for word, count in word_counts.most_common():
-            f.write(f"{word}\t{count}\t{doc_frequency[word]}\n")
+    save_word_stats(word_counts, doc_frequency, os.path.join(output_dir, 'word_stats.tsv'))
     
     # Identify rare words (appearing in <= rare_threshold texts)
-    rare_words = {word: (count, doc_frequency[word]) 
-                 for word, count in word_counts.items() 
-                 if doc_frequency[word] <= rare_threshold}
+    rare_words = find_rare_words(word_counts, doc_frequency, rare_threshold)
     
     print(f"Found {len(rare_words):,} rare words (in <= {rare_threshold} texts)")
     
 
-    with open(os.path.join(output_dir, 'rare_words_1.tsv'), 'w', encoding='utf-8') as f:
-        f.write("word\tcount\tdocument_frequency\n")
-        for word, (count, df) in sorted(rare_words.items(), key=lambda x: (x[1][1], x[1][0])):
-            f.write(f"{word}\t{count}\t{df}\n")
+    save_rare_words(rare_words, os.path.join(output_dir, 'rare_words_1.tsv'))
     
 
     # Frequency distribution plot
@@ -57,4 +130,5 @@ def analyze_corpus(corpus_path, output_dir, rare_threshold=2):
     return word_counts, doc_frequency
 
 
-word_counts, doc_freq = analyze_corpus("slovenian_corpus.txt", "corpus_analysis", rare_threshold=2)
+if __name__ == '__main__':
+    word_counts, doc_freq = analyze_corpus("slovenian_corpus.txt", "corpus_analysis", rare_threshold=2)
@@ -1,6 +1,5 @@
-import os
-import xml.etree.ElementTree as ET
 from pathlib import Path
+from tei_lemmas import extract_lemmas_pos
 
 def process_xml_files(input_folder, output_folder):
     """Process all files extracting lemmas and POS tags"""
@@ -14,30 +13,14 @@ def process_xml_files(input_folder, output_folder):
 
     for xml_file in Path(input_folder).rglob('*.xml'):
         try:
-            tree = ET.parse(xml_file)
-            root = tree.getroot()
-            lemmas = []
-            
-            for elem in root.iter():
-                tag = elem.tag.split('}')[-1]  # Remove namespace if present
-            
-            # Get all <w> elements
-                if tag == 'w':
-                    lemma = elem.get('lemma', '').strip()
-                    pos = elem.get('pos', '').strip()
-                    
-                    if lemma and pos:
-                        lemmas.append(f"{lemma}\t{pos}")
-                        pos_tags.add(pos)
-            
-            if lemmas:
-                output_file = output_path / f"{xml_file.stem}_lemma_pos.tsv"
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    f.write("Lemma\tPOS\n" + "\n".join(lemmas))
-                
+            output_file = output_path / f"{xml_file.stem}_lemma_pos.tsv"
+            count, _, file_pos = extract_lemmas_pos(xml_file, output_file, 'eltec')
+            pos_tags.update(file_pos)
+
+            if count:
                 processed_files += 1
-                total_lemmas += len(lemmas)
-                print(f"✓ Processed {xml_file.name} ({len(lemmas)} lemmas)")
+                total_lemmas += count
+                print(f"✓ Processed {xml_file.name} ({count} lemmas)")
                 
         except Exception as e:
             print(f"✗ Error processing {xml_file.name}: {str(e)}")
@@ -51,4 +34,3 @@ def process_xml_files(input_folder, output_folder):
 input_folder = "ELTeC-slv-2.0.0/level2"
 output_folder = "ELTeC-lemma-pos"
 process_xml_files(input_folder, output_folder)
-
@@ -1,89 +1,13 @@
-import os
-import xml.etree.ElementTree as ET
 from pathlib import Path
-
-# POS tag mapping (first letter to standardized tag)
-POS_MAPPING = {
-    'A': 'ADJ',
-    'C': 'CCONJ',
-    'I': 'INTJ',
-    'M': 'NUM',
-    'N': 'NOUN',
-    'P': 'PRON',
-    'Q': 'PART',
-    'R': 'ADV',
-    'S': 'ADP',
-    'V': 'VERB',
-    'X': 'X',
-    'Y': 'PROPN'
-}
-
-def extract_pos(ana):
-    """Extract POS tag from ana attribute and transform it"""
-    if not ana:
-        return ''
-    # Get first character of the tag (before any hyphen or colon)
-    first_char = ana.split(':')[-1][0] if ':' in ana else ana[0]
-    return POS_MAPPING.get(first_char, 'X')  # Default to X if unknown
-
-def is_inside_orig(elem):
-    """Check if element is inside <orig> by manual tree traversal"""
-    path = []
-    while elem is not None:
-        path.append(elem.tag)
-        if 'orig' in elem.tag:
-            return True
-        elem = elem.find('..')  # Parent element alternative
-    return False
+from tei_lemmas import extract_lemmas_pos
 
 def process_wikivir_file(xml_path, output_path):
     """Process a single file"""
     try:
-        # Remove namespace declarations first
-        with open(xml_path, 'r', encoding='utf-8') as f:
-            xml_content = f.read()
-        xml_content = xml_content.replace('xmlns="http://www.tei-c.org/ns/1.0"', '')
-        
-        root = ET.fromstring(xml_content)
-        lemmas = []
-        # Store both original and transformed POS tags
-        original_pos_tags = set()
-        transformed_pos_tags = set()
+        count, original_pos_tags, transformed_pos_tags = extract_lemmas_pos(xml_path, output_path, 'imp')
 
-        # Process all <w> elements
-        for w in root.findall('.//w'):
-            # Skip if inside <orig> when there's a <reg> alternative
-            if is_inside_orig(w):
-                continue
-                
-            lemma = w.get('lemma')
-            ana = w.get('ana', '')
-            original_pos = ana.split(':')[-1].split('-')[0] if ':' in ana else ana.split('-')[0]
-            pos = extract_pos(ana)
-            
-            if lemma and pos:
-                lemmas.append(f"{lemma}\t{pos}")
-                original_pos_tags.add(original_pos)
-                transformed_pos_tags.add(pos)
-
-        # Process <reg> elements (preferred versions)
-        for reg in root.findall('.//reg'):
-            for w in reg.findall('w'):
-                lemma = w.get('lemma')
-                ana = w.get('ana', '')
-                original_pos = ana.split(':')[-1].split('-')[0] if ':' in ana else ana.split('-')[0]
-                pos = extract_pos(ana)
-                
-                if lemma and pos:
-                    lemmas.append(f"{lemma}\t{pos}")
-                    original_pos_tags.add(original_pos)
-                    transformed_pos_tags.add(pos)
-
-        # Write output
-        if lemmas:
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write("Lemma\tPOS\n" + "\n".join(lemmas))
-            print(f"✓ Processed {xml_path.name} ({len(lemmas)} lemmas)")
+        if count:
+            print(f"✓ Processed {xml_path.name} ({count} lemmas)")
             return original_pos_tags, transformed_pos_tags
         else:
             print(f" No lemmas in {xml_path.name}")
@@ -1,36 +1,13 @@
-import xml.etree.ElementTree as ET
 from pathlib import Path
+from tei_lemmas import extract_lemmas_pos
 
-def extract_pos(msd):
-    """Extract the UPosTag value from msd attribute"""
-    if not msd:
-        return ''
-    parts = msd.split('|')
-    for part in parts:
-        if part.startswith('UPosTag='):
-            return part[8:]  # Get text after 'UPosTag='
-    return ''
-
-def process_file(xml_file, output_file):
+def process_file(xml_file, output_file, corpus):
     """Process a single file"""
     try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        lemmas = []
-        # Store unique POS tags
-        pos_tags = set()
-
-        for w in root.findall('.//{http://www.tei-c.org/ns/1.0}w'):
-            lemma = w.get('lemma')
-            pos = extract_pos(w.get('msd', ''))
-            if lemma and pos:
-                lemmas.append(f"{lemma}\t{pos}")
-                pos_tags.add(pos)
+        count, _, pos_tags = extract_lemmas_pos(xml_file, output_file, corpus)
 
-        if lemmas:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write("Lemma\tPOS\n" + "\n".join(lemmas))
-            print(f"✓ Processed {xml_file.name} ({len(lemmas)} lemmas)")
+        if count:
+            print(f"✓ Processed {xml_file.name} ({count} lemmas)")
             return pos_tags
         return set()
 
@@ -38,7 +15,7 @@ def process_file(xml_file, output_file):
         print(f"Error in {xml_file.name}: {str(e)}")
         return set()
 
-def process_corpus(input_dir, output_dir):
+def process_corpus(input_dir, output_dir, corpus='kdsp'):
     """Process all files of the corpus"""
     input_path = Path(input_dir)
     output_path = Path(output_dir)
@@ -49,7 +26,7 @@ def process_corpus(input_dir, output_dir):
 
     for xml_file in input_path.glob('*.xml'):
         out_file = output_path / f"{xml_file.stem}_lemma_pos.tsv"
-        file_pos = process_file(xml_file, out_file)
+        file_pos = process_file(xml_file, out_file, corpus)
         pos_tags.update(file_pos)
         if file_pos:
             processed += 1
@@ -60,8 +37,8 @@ def process_corpus(input_dir, output_dir):
 
 input_folder = "KDSP.TEI.ana"
 output_folder = "KDSP-lemma-pos"
-process_corpus(input_folder, output_folder)
+process_corpus(input_folder, output_folder, corpus='kdsp')
 
 input_folder = "maj68.TEI.ana"
 output_folder = "maj68-lemma-pos"
-process_corpus(input_folder, output_folder)
\ No newline at end of file
+process_corpus(input_folder, output_folder, corpus='maj68')
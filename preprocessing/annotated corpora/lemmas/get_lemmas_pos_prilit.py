@@ -1,40 +1,13 @@
-import os
-import xml.etree.ElementTree as ET
 from pathlib import Path
-
-def extract_pos(msd_attr):
-    """Extract POS tag from msd attribute (UposTag value)"""
-    if not msd_attr:
-        return ''
-    # Get the UposTag value (e.g., "NOUN" from "UposTag=NOUN|Case=Nom...")
-    for part in msd_attr.split('|'):
-        if part.startswith('UposTag='):
-            return part[8:]  # Return everything after 'UposTag='
-    return ''
+from tei_lemmas import extract_lemmas_pos
 
 def process_mte_file(xml_file, output_file):
     """Process a single file"""
     try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        lemmas = []
-        # Store unique POS tags
-        pos_tags = set()
-
-        # Process all word elements
-        for w in root.findall('.//{http://www.tei-c.org/ns/1.0}w'):
-            lemma = w.get('lemma')
-            msd = w.get('msd', '')
-            pos = extract_pos(msd)
-            
-            if lemma and pos:
-                lemmas.append(f"{lemma}\t{pos}")
-                pos_tags.add(pos)
+        count, _, pos_tags = extract_lemmas_pos(xml_file, output_file, 'prilit')
 
-        if lemmas:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write("Lemma\tPOS\n" + "\n".join(lemmas))
-            print(f"✓ Processed {xml_file.name} ({len(lemmas)} lemmas)")
+        if count:
+            print(f"✓ Processed {xml_file.name} ({count} lemmas)")
             return pos_tags
         else:
             print(f"No lemmas in {xml_file.name}")
@@ -67,4 +40,3 @@ def process_mte_corpus(input_dir, output_dir):
 input_folder = "Prilit.ana"
 output_folder = "Prilit-lemma-pos"
 process_mte_corpus(input_folder, output_folder)
-
@@ -0,0 +1,187 @@
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from functools import lru_cache
+
+# POS tag mapping for IMP MTE tags (first letter to standardized tag)
+IMP_POS_MAPPING = {
+    'A': 'ADJ',
+    'C': 'CCONJ',
+    'I': 'INTJ',
+    'M': 'NUM',
+    'N': 'NOUN',
+    'P': 'PRON',
+    'Q': 'PART',
+    'R': 'ADV',
+    'S': 'ADP',
+    'V': 'VERB',
+    'X': 'X',
+    'Y': 'PROPN'
+}
+
+
+@lru_cache(maxsize=None)
+def local_name(tag):
+    """Remove namespace from a tag if present (cached, documents use few distinct tags)"""
+    return tag.split('}')[-1]
+
+
+def msd_feature(msd, feature):
+    """Extract the value of one feature (e.g. 'UposTag') from msd attribute"""
+    if not msd:
+        return ''
+    prefix = feature + '='
+    for part in msd.split('|'):
+        if part.startswith(prefix):
+            return part[len(prefix):]
+    return ''
+
+
+# Adapters: get (lemma, pos, original tag) out of the attributes of <w>
+
+def eltec_adapter(attrib):
+    """ELTeC: lemma and pos attributes"""
+    pos = attrib.get('pos', '').strip()
+    return attrib.get('lemma', '').strip(), pos, pos
+
+
+def imp_adapter(attrib):
+    """IMP: MTE tag in ana attribute, mapped by its first letter"""
+    ana = attrib.get('ana', '')
+    if not ana:
+        return attrib.get('lemma'), '', ''
+    tag = ana.split(':')[-1] if ':' in ana else ana
+    pos = IMP_POS_MAPPING.get(tag[0], 'X')  # Default to X if unknown
+    return attrib.get('lemma'), pos, tag.split('-')[0]
+
+
+def prilit_adapter(attrib):
+    """Prilit: UposTag value in msd attribute"""
+    pos = msd_feature(attrib.get('msd', ''), 'UposTag')
+    return attrib.get('lemma'), pos, pos
+
+
+def kdsp_maj68_adapter(attrib):
+    """KDSP and maj68: UPosTag value in msd attribute"""
+    pos = msd_feature(attrib.get('msd', ''), 'UPosTag')
+    return attrib.get('lemma'), pos, pos
+
+
+ADAPTERS = {
+    'eltec': eltec_adapter,
+    'imp': imp_adapter,
+    'prilit': prilit_adapter,
+    'kdsp': kdsp_maj68_adapter,
+    'maj68': kdsp_maj68_adapter,
+}
+
+# Adapters whose scripts resolved <choice> (get_lemmas_pos_imp.py); the others
+# took every <w>, of <orig> and <reg> alike
+CHOICE_ADAPTERS = {imp_adapter}
+
+
+def choice_branch(stack):
+    """Get 'orig'/'reg' branch of the innermost open <choice>, if any"""
+    branch = None
+    for elem in reversed(stack):
+        tag = local_name(elem.tag)
+        if tag == 'choice':
+            return branch
+        if tag in ('orig', 'reg') and branch is None:
+            branch = tag
+    return None
+
+
+def iter_lemmas_pos(xml_file, adapter, keep=(), on_end=None, resolve_choice=None):
+    """Stream (lemma, pos, original tag) for every <w> of a TEI file
+
+    resolve_choice - inside <choice> keep the words of <reg> (preferred version)
+    and drop words of <orig>, <orig> is used only when there is no <reg>;
+    default: only for the IMP adapter, the other corpora keep both
+
+    keep - tags (e.g. 'p', 'titleStmt') whose subtrees stay complete until
+    they end, then on_end(tag, elem, stack) is called with the whole element
+    before it is dropped
+    """
+    if isinstance(adapter, str):
+        adapter = ADAPTERS[adapter]
+    if resolve_choice is None:
+        resolve_choice = adapter in CHOICE_ADAPTERS
+
+    stack = []
+    kept = 0  # Open elements of keep
+    # One [(branch, word) items, has <reg>] buffer per open <choice>
+    choices = []
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        tag = local_name(elem.tag)
+        if event == 'start':
+            if tag == 'choice' and resolve_choice:
+                choices.append([[], False])
+            elif tag == 'reg' and choices and local_name(stack[-1].tag) == 'choice':
+                choices[-1][1] = True
+            kept += tag in keep
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        words = None
+        if tag == 'w':
+            lemma, pos, original_pos = adapter(elem.attrib)
+            if lemma and pos:
+                words = [(lemma, pos, original_pos)]
+        elif tag == 'choice' and resolve_choice:
+            items, has_reg = choices.pop()
+            words = [word for branch, word in items
+                     if not (has_reg and branch == 'orig')]
+
+        if words:
+            if choices:
+                branch = choice_branch(stack)
+                choices[-1][0].extend((branch, word) for word in words)
+            else:
+                yield from words
+
+        if tag in keep:
+            on_end(tag, elem, stack)
+            kept -= 1
+        if kept:
+            continue  # Part of a kept subtree
+
+        # Drop finished elements, so only the open path stays in memory
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
+
+
+def extract_lemmas_pos(xml_file, output_file, adapter):
+    """Write Lemma\\tPOS file for a TEI file, return lemma count and POS tags"""
+    return write_lemmas_pos(iter_lemmas_pos(xml_file, adapter), output_file)
+
+
+def write_lemmas_pos(lemmas, output_file):
+    """Write Lemma\\tPOS file of (lemma, pos, original tag) items, return lemma count and POS tags"""
+    output_file = Path(output_file)
+    tmp_file = output_file.with_name(output_file.name + '.part')
+    count = 0
+    original_pos_tags = set()
+    pos_tags = set()
+
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for lemma, pos, original_pos in lemmas:
+                # Same layout as "Lemma\tPOS\n" + "\n".join(lemmas)
+                f.write(f"\n{lemma}\t{pos}" if count else f"Lemma\tPOS\n{lemma}\t{pos}")
+                count += 1
+                original_pos_tags.add(original_pos)
+                pos_tags.add(pos)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+
+    # Write output only for files with lemmas
+    if count:
+        os.replace(tmp_file, output_file)
+    else:
+        tmp_file.unlink()
+    return count, original_pos_tags, pos_tags
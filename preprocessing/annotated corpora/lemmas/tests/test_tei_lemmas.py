@@ -0,0 +1,48 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tei_lemmas import extract_lemmas_pos, iter_lemmas_pos
+
+IMP_CHOICES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'imp_choices.xml')
+PRILIT_CHOICES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prilit_choices.xml')
+
+# Every token once, in document order: <reg> inside <choice>, <orig> only without <reg>
+EXPECTED = [
+    ('v', 'ADP'),  # Outside any choice
+    ('zdaj', 'ADV'),  # orig + reg
+    ('kir', 'CCONJ'),  # orig only
+    ('človek', 'NOUN'),  # reg before orig
+    ('srce', 'NOUN'),  # Nested choice
+    ('lep', 'ADJ'),
+    ('on', 'PRON'),  # Outside any choice
+]
+
+
+def test_choice_lemmas():
+    assert [(lemma, pos) for lemma, pos, _ in iter_lemmas_pos(IMP_CHOICES, 'imp')] == EXPECTED
+
+
+def test_choice_lemmas_file(tmp_path):
+    output_file = tmp_path / 'imp_choices_lemma_pos.tsv'
+    count, original_pos_tags, pos_tags = extract_lemmas_pos(IMP_CHOICES, output_file, 'imp')
+
+    assert count == len(EXPECTED) == 7
+    assert pos_tags == {'ADP', 'ADV', 'CCONJ', 'NOUN', 'ADJ', 'PRON'}
+    assert original_pos_tags == {'Sl', 'Rgp', 'Cs', 'Ncmsn', 'Ncnsn', 'Agpnsn', 'Pp3msn'}
+    with open(output_file, encoding='utf-8') as f:
+        assert f.read() == "Lemma\tPOS\n" + "\n".join(f"{lemma}\t{pos}" for lemma, pos in EXPECTED)
+
+
+def test_choice_kept_for_other_corpora():
+    # Same as the old findall('.//w') scripts: <orig> and <reg> words in document order
+    expected = [('v', 'ADP'), ('zdej', 'ADV'), ('zdaj', 'ADV'), ('kir', 'SCONJ'),
+                ('človek', 'NOUN'), ('člověk', 'NOUN'), ('on', 'PRON')]
+    assert [(lemma, pos) for lemma, pos, _ in iter_lemmas_pos(PRILIT_CHOICES, 'prilit')] == expected
+
+
+def test_choice_resolution_option():
+    lemmas = [lemma for lemma, _, _ in iter_lemmas_pos(PRILIT_CHOICES, 'prilit', resolve_choice=True)]
+    assert lemmas == ['v', 'zdaj', 'kir', 'človek', 'on']
+    lemmas = [lemma for lemma, _, _ in iter_lemmas_pos(IMP_CHOICES, 'imp', resolve_choice=False)]
+    assert len(lemmas) == 12  # Every <w> with its lemma
@@ -0,0 +1,237 @@
+import os
+import re
+import csv
+import sys
+import time
+import argparse
+from pathlib import Path
+from multiprocessing import Pool
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lemmas'))
+from tei_lemmas import iter_lemmas_pos, local_name, write_lemmas_pos
+
+ns = {'tei': 'http://www.tei-c.org/ns/1.0'}
+W = '{http://www.tei-c.org/ns/1.0}w'
+ORIG = '{http://www.tei-c.org/ns/1.0}orig'
+
+
+def clean_filename(text):
+    """Clean text to be safe for filenames"""
+    # Remove invalid characters
+    text = re.sub(r'[<>:"/\\|?*]', '', text)
+    # Replace multiple spaces with single space
+    text = re.sub(r'\s+', ' ', text).strip()
+    # Shorten if too long
+    return text[:100]
+
+
+# Metadata: (title, author) out of <titleStmt>, as in get_titles_from_*.py; None if missing
+
+def child_text(parent, tag):
+    elem = parent.find(f'tei:{tag}', ns)
+    return elem.text if elem is not None and elem.text else None
+
+
+def eltec_metadata(title_stmt):
+    """ELTeC (and Prilit): <title> (first part) and <author>"""
+    title, author = child_text(title_stmt, 'title'), child_text(title_stmt, 'author')
+    return clean_filename(title.split(':')[0]) if title else None, clean_filename(author) if author else None
+
+
+def imp_metadata(title_stmt):
+    """IMP: 'Author: Title' in <title>, title only if there is no ': '"""
+    title = child_text(title_stmt, 'title')
+    if not title:
+        return None, None
+    author, separator, name = title.partition(': ')
+    if not separator:
+        return clean_filename(title.split(':')[0]), None
+    return clean_filename(name.split(':')[0]), clean_filename(author)
+
+
+def kdsp_maj68_metadata(title_stmt):
+    """KDSP and maj68: <title> without the [KDSP.ana] suffix and <author>"""
+    title, author = child_text(title_stmt, 'title'), child_text(title_stmt, 'author')
+    title = clean_filename(re.sub(r'\s*\[.*\]\s*', '', title)) if title else None
+    return title, clean_filename(author) if author else None
+
+
+# Text: plain text of one unit (<p> or <s> in <body>), units are joined with empty lines
+
+def paragraph_text(p):
+    """ELTeC: all text of the paragraph, whitespace normalized (as get_text_from_eltec.py)"""
+    return ' '.join(''.join(p.itertext()).split())
+
+
+def imp_sentence_text(s):
+    """IMP: tokens of the sentence with <c> spaces, original spelling (as get_text_from_imp.py)"""
+    sentence_parts = []
+    prev_was_punct = False
+    for elem in s:
+        tag = local_name(elem.tag)
+        if tag == 'choice':
+            # First <w> of an <orig> (as find('.//tei:orig/tei:w'))
+            text = next((w.text for orig in elem.iter(ORIG) for w in orig if w.tag == W), "")
+        elif tag == 'w':
+            text = elem.text
+        elif tag == 'pc':
+            text = elem.text
+            # Skip space if it's after/before punctuation
+            if prev_was_punct and text in ('«', '»', '"', "'"):
+                continue
+            prev_was_punct = True
+        elif tag == 'c' and elem.text == ' ':
+            # Only add space if not adjacent to punctuation
+            text = ' ' if not prev_was_punct else ''
+            prev_was_punct = False
+        else:
+            text = ''
+        if text:
+            sentence_parts.append(text)
+    return ''.join(sentence_parts).strip()
+
+
+def joined_sentence_text(s):
+    """Prilit, KDSP and maj68: <w>/<pc> tokens separated by spaces except after join="right", original spelling"""
+    parts = []
+
+    def walk(elem):
+        for child in elem:
+            tag = local_name(child.tag)
+            if tag == 'reg':
+                continue
+            if tag in ('w', 'pc'):
+                parts.append((child.text or '') + ('' if child.get('join') == 'right' else ' '))
+            else:
+                walk(child)
+
+    walk(s)
+    return ''.join(parts).strip()
+
+
+FORMATS = {
+    'eltec': {'unit': 'p', 'text': paragraph_text, 'metadata': eltec_metadata, 'name': '{title} ({author})'},
+    'imp': {'unit': 's', 'text': imp_sentence_text, 'metadata': imp_metadata, 'name': '{title} ({author})'},
+    'prilit': {'unit': 's', 'text': joined_sentence_text, 'metadata': eltec_metadata, 'name': '{title} ({author})'},
+    'kdsp': {'unit': 's', 'text': joined_sentence_text, 'metadata': kdsp_maj68_metadata, 'name': '{title}_({author})'},
+    'maj68': {'unit': 's', 'text': joined_sentence_text, 'metadata': kdsp_maj68_metadata, 'name': '{title}_({author})'},
+}
+
+
+def process_file(task):
+    '''
+    Stream one TEI file once and write its plain text and Lemma\\tPOS file
+    (temporary names after the number of the file, renamed by process_corpus); runs in the pool
+
+    Returns metadata record (file, title, author, lemmas, characters, pos tags, error)
+    '''
+    number, xml_file, corpus, text_folder, lemma_folder = task
+    fmt = FORMATS[corpus]
+    unit = fmt['unit']
+    record = {'number': number, 'file': xml_file.name, 'title': 'Unknown Title', 'author': 'Unknown Author',
+              'lemmas': 0, 'characters': 0, 'pos_tags': set(), 'error': None}
+    text_file = text_folder / f"{number}.txt.part"
+    found_stmt = False
+
+    with open(text_file, 'w', encoding='utf-8') as f:
+        def on_end(tag, elem, stack):
+            nonlocal found_stmt
+            if tag == unit and any(local_name(parent.tag) == 'body' for parent in stack):
+                text = fmt['text'](elem)
+                if text:
+                    # Same as '\n\n'.join(units)
+                    f.write('\n\n' + text if record['characters'] else text)
+                    record['characters'] += len(text) + (2 if record['characters'] else 0)
+            elif tag == 'titleStmt' and not found_stmt:
+                found_stmt = True
+                # A broken header only loses the names, never the text and lemmas
+                try:
+                    title, author = fmt['metadata'](elem)
+                except Exception:
+                    title, author = None, None
+                record['title'] = title or 'Unknown Title'
+                record['author'] = author or 'Unknown Author'
+
+        try:
+            lemmas = iter_lemmas_pos(xml_file, corpus, keep=('titleStmt', unit), on_end=on_end)
+            record['lemmas'], _, record['pos_tags'] = write_lemmas_pos(
+                lemmas, lemma_folder / f"{number}.lemma_pos.part")
+        except Exception as e:
+            record['error'] = str(e)
+    return record
+
+
+def process_corpus(input_folder, text_folder, lemma_folder, corpus, metadata_file=None, workers=None):
+    '''
+    Plain texts, metadata and lemmas of all TEI files of a corpus with one parse
+    of each file (instead of get_text_from_*, get_titles_from_* and get_lemmas_pos_*)
+
+    corpus - 'eltec', 'imp', 'prilit', 'kdsp' or 'maj68'
+
+    Texts are saved as "<title> (<author>).txt" (KDSP, maj68: "<title>_(<author>).txt"),
+    lemmas as "<same name>_lemma_pos.tsv" and the table of files (file, title, author,
+    name, lemmas, characters) to metadata_file (default <text_folder>/metadata.tsv);
+    source files are not renamed
+    '''
+    text_folder, lemma_folder = Path(text_folder), Path(lemma_folder)
+    text_folder.mkdir(parents=True, exist_ok=True)
+    lemma_folder.mkdir(parents=True, exist_ok=True)
+    metadata_file = metadata_file or text_folder / 'metadata.tsv'
+
+    xml_files = sorted(Path(input_folder).rglob('*.xml'))
+    # Largest files first, so one large file does not finish the run alone
+    tasks = sorted(((number, xml_file, corpus, text_folder, lemma_folder) for number, xml_file in enumerate(xml_files)),
+                   key=lambda task: -task[1].stat().st_size)
+    start = time.time()
+    with Pool(workers) as pool:
+        records = {record['number']: record for record in pool.imap_unordered(process_file, tasks)}
+
+    # Names are given in the order of the files, duplicates get _1, _2, ...
+    names = set()
+    pos_tags = set()
+    rows = []
+    for number, xml_file in enumerate(xml_files):
+        record = records[number]
+        text_part = text_folder / f"{number}.txt.part"
+        lemma_part = lemma_folder / f"{number}.lemma_pos.part"
+        if record['error']:
+            text_part.unlink(missing_ok=True)
+            lemma_part.unlink(missing_ok=True)
+            print(f"✗ Error processing {xml_file.name}: {record['error']}")
+            continue
+
+        base = FORMATS[corpus]['name'].format(title=record['title'], author=record['author'])
+        name, counter = base, 1
+        while name in names:
+            name = f"{base}_{counter}"
+            counter += 1
+        names.add(name)
+
+        os.replace(text_part, text_folder / f"{name}.txt")
+        if record['lemmas']:
+            os.replace(lemma_part, lemma_folder / f"{name}_lemma_pos.tsv")
+        pos_tags.update(record['pos_tags'])
+        rows.append([xml_file.name, record['title'], record['author'], name, record['lemmas'], record['characters']])
+
+    with open(metadata_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(['file', 'title', 'author', 'name', 'lemmas', 'characters'])
+        writer.writerows(rows)
+
+    print(f"Processed {len(rows)} of {len(xml_files)} files: {time.time() - start:.1f} s")
+    print("Unique POS tags found:", ", ".join(sorted(pos_tags)))
+    print(f"Total lemmas extracted: {sum(row[4] for row in rows)}")
+    return rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Text, metadata and lemmas of TEI files in one parse")
+    parser.add_argument('corpus', choices=sorted(FORMATS))
+    parser.add_argument('input_folder')
+    parser.add_argument('text_folder')
+    parser.add_argument('lemma_folder')
+    parser.add_argument('--metadata', default=None, help="metadata table, default <text_folder>/metadata.tsv")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    process_corpus(args.input_folder, args.text_folder, args.lemma_folder, args.corpus, args.metadata, args.workers)
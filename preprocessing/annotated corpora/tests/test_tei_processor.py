@@ -0,0 +1,57 @@
+import os
+import sys
+import csv
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from tei_processor import process_corpus
+
+TEI = '<?xml version="1.0" encoding="UTF-8"?>\n<TEI xmlns="http://www.tei-c.org/ns/1.0">{header}<text><body><p>{body}</p></body></text></TEI>'
+IMP_BODY = ('<s><w lemma="hlapec" ana="mte:Ncmpn">Hlapci</w><c> </c><w lemma="biti" ana="mte:Va-r3p-n">so</w>'
+            '<pc ana="mte:Z">.</pc></s>')
+ELTEC_BODY = '<w lemma="hlapec" pos="NOUN">Hlapci</w> <w lemma="biti" pos="AUX">so</w><pc pos="PUNCT">.</pc>'
+
+
+def header(title=None, author=None):
+    parts = [f'<title>{title}</title>' if title is not None else '', f'<author>{author}</author>' if author is not None else '']
+    return f'<teiHeader><fileDesc><titleStmt>{"".join(parts)}</titleStmt></fileDesc></teiHeader>'
+
+
+def run(tmp_path, corpus, files):
+    source = tmp_path / 'tei'
+    source.mkdir()
+    for name, text in files.items():
+        (source / name).write_text(text, encoding='utf-8')
+    process_corpus(source, tmp_path / 'txt', tmp_path / 'lemmas', corpus, workers=1)
+    with open(tmp_path / 'txt' / 'metadata.tsv', encoding='utf-8') as f:
+        return {row['file']: row for row in csv.DictReader(f, delimiter='\t')}
+
+
+def test_imp_metadata(tmp_path):
+    rows = run(tmp_path, 'imp', {
+        'a.xml': TEI.format(header=header('Cankar, Ivan: Hlapci: drama'), body=IMP_BODY),
+        'b.xml': TEI.format(header=header('Hlapci'), body=IMP_BODY),  # No "Author: "
+        'c.xml': TEI.format(header='', body=IMP_BODY),  # No <titleStmt>
+    })
+    assert [(rows[file]['title'], rows[file]['author'], rows[file]['lemmas']) for file in sorted(rows)] == [
+        ('Hlapci', 'Cankar, Ivan', '2'), ('Hlapci', 'Unknown Author', '2'), ('Unknown Title', 'Unknown Author', '2')]
+    for row in rows.values():
+        assert (tmp_path / 'txt' / f"{row['name']}.txt").read_text(encoding='utf-8') == 'Hlapci so.'
+        assert (tmp_path / 'lemmas' / f"{row['name']}_lemma_pos.tsv").exists()
+
+
+def test_missing_author(tmp_path):
+    rows = run(tmp_path, 'eltec', {
+        'a.xml': TEI.format(header=header('Hlapci: drama v petih aktih'), body=ELTEC_BODY),
+        'b.xml': TEI.format(header=header(title=''), body=ELTEC_BODY),  # Empty <title>, no <author>
+    })
+    assert [(rows[file]['name'], rows[file]['lemmas']) for file in sorted(rows)] == [
+        ('Hlapci (Unknown Author)', '2'), ('Unknown Title (Unknown Author)', '2')]
+    assert (tmp_path / 'txt' / 'Hlapci (Unknown Author).txt').read_text(encoding='utf-8') == 'Hlapci so.'
+
+
+def test_kdsp_missing_author(tmp_path):
+    body = ('<s><w lemma="hlapec" msd="UPosTag=NOUN">Hlapci</w><w lemma="biti" msd="UPosTag=AUX" join="right">so</w>'
+            '<pc msd="UPosTag=PUNCT">.</pc></s>')
+    rows = run(tmp_path, 'kdsp', {'a.xml': TEI.format(header=header('Hlapci [KDSP.ana]'), body=body)})
+    assert (rows['a.xml']['name'], rows['a.xml']['lemmas']) == ('Hlapci_(Unknown Author)', '2')
+    assert (tmp_path / 'txt' / 'Hlapci_(Unknown Author).txt').read_text(encoding='utf-8') == 'Hlapci so.'
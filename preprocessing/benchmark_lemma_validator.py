@@ -0,0 +1,43 @@
+import os
+import time
+import slovenian_lemmas
+from slovenian_lemmas import clean_lemmas
+
+
+allowed_tokens = {"person1", "proper1", "number1"}
+slovenian_chars = set("abcčdefghijklmnoprsštuvzžABCČDEFGHIJKLMNOPRSŠTUVZŽ")
+
+
+def is_valid_lemma_per_char(lemma):
+    """Previous validator of make_corpus.py: checks lemma character by character"""
+    if lemma in allowed_tokens:
+        return True
+    return all(c in slovenian_chars for c in lemma.lower())
+
+
+def benchmark(source_folder):
+    """Compare per-character loop and shared validator on all files of the corpus"""
+    texts = []
+    for filename in os.listdir(source_folder):
+        if filename.endswith('.txt'):
+            with open(os.path.join(source_folder, filename), 'r', encoding='utf-8') as f:
+                texts.append(f.read().split())
+    total = sum(len(lemmas) for lemmas in texts)
+    print(f"{len(texts)} texts, {total:,} lemmas")
+
+    start_time = time.time()
+    old = [[lemma for lemma in lemmas if is_valid_lemma_per_char(lemma)] for lemmas in texts]
+    old_time = time.time() - start_time
+
+    slovenian_lemmas.verdicts.clear()  # Start with empty cache
+    start_time = time.time()
+    new = [clean_lemmas(lemmas) for lemmas in texts]
+    new_time = time.time() - start_time
+
+    assert old == new, "Validators disagree"
+    print(f"Per-character loop: {old_time:.2f} s")
+    print(f"Shared validator:   {new_time:.2f} s ({len(slovenian_lemmas.verdicts):,} distinct lemmas checked)")
+    print(f"Speedup: {old_time / new_time:.1f}x")
+
+
+benchmark("annotated corpora + dglib")
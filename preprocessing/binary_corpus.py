@@ -0,0 +1,132 @@
+import os
+from array import array
+from collections import Counter
+
+# Binary corpus <prefix>: vocabulary (one word per line, id = line number),
+# flat token ids and offsets of the texts (n_texts + 1 values) in the token array
+VOCAB_SUFFIX = '.vocab.txt'
+TOKENS_SUFFIX = '.tokens.u32'
+OFFSETS_SUFFIX = '.offsets.u64'
+
+
+class BinaryCorpusWriter:
+    """Write texts to binary corpus, ids are given to words in order of first occurrence"""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.word_ids = {}
+        self.offsets = array('Q', [0])
+        self.tokens_file = open(prefix + TOKENS_SUFFIX, 'wb')
+
+    def add_text(self, words):
+        word_ids = self.word_ids
+        ids = array('I', [word_ids.setdefault(word, len(word_ids)) for word in words])
+        ids.tofile(self.tokens_file)
+        self.offsets.append(self.offsets[-1] + len(ids))
+
+    def close(self):
+        self.tokens_file.close()
+        with open(self.prefix + OFFSETS_SUFFIX, 'wb') as f:
+            self.offsets.tofile(f)
+        with open(self.prefix + VOCAB_SUFFIX, 'w', encoding='utf-8') as f:
+            f.writelines(word + '\n' for word in self.word_ids)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_text_corpus(corpus_file, prefix):
+    """Write binary version of a text corpus (one text per line)"""
+    with open(corpus_file, 'r', encoding='utf-8') as f, BinaryCorpusWriter(prefix) as writer:
+        for line in f:
+            writer.add_text(line.split())
+
+
+def load_binary_corpus(prefix):
+    """Load (vocabulary, token ids, offsets), arrays are memory-mapped, not read"""
+    import numpy as np
+
+    with open(prefix + VOCAB_SUFFIX, 'r', encoding='utf-8') as f:
+        vocab = f.read().split('\n')[:-1]
+
+    def memmap(path, dtype):
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)  # np.memmap can not map empty files
+        return np.memmap(path, dtype=dtype, mode='r')
+
+    tokens = memmap(prefix + TOKENS_SUFFIX, np.uint32)
+    offsets = memmap(prefix + OFFSETS_SUFFIX, np.uint64)
+    return vocab, tokens, offsets
+
+
+class BinaryCorpusSentences:
+    """Restartable iterable of texts as lists of words, e.g. for gensim Word2Vec(sentences=...)
+
+    max_length - split texts into pieces of at most max_length words (gensim
+    truncates longer sentences to 10000 words, corpus_file mode splits them)
+    """
+
+    def __init__(self, prefix, max_length=None):
+        self.vocab, self.tokens, self.offsets = load_binary_corpus(prefix)
+        self.max_length = max_length
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        vocab = self.vocab
+        for start, end in zip(self.offsets[:-1].tolist(), self.offsets[1:].tolist()):
+            step = self.max_length or max(end - start, 1)
+            for piece in range(start, max(end, start + 1), step):
+                yield [vocab[i] for i in self.tokens[piece:min(piece + step, end)].tolist()]
+
+
+def count_matrix(prefix, block_tokens=10_000_000):
+    """Texts x words matrix of counts (scipy CSR), columns in vocabulary order
+
+    Built from blocks of texts with about block_tokens tokens, so temporary
+    arrays stay bounded.
+    """
+    import numpy as np
+    from scipy.sparse import csr_matrix, vstack
+
+    vocab, tokens, offsets = load_binary_corpus(prefix)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    blocks = []
+    first = 0
+    while first < len(offsets) - 1:
+        # At least one text per block
+        last = max(first + 1, int(np.searchsorted(offsets, offsets[first] + block_tokens, side='right')) - 1)
+        last = min(last, len(offsets) - 1)
+        start, end = offsets[first], offsets[last]
+        block = csr_matrix((np.ones(end - start, dtype=np.int32),
+                            tokens[start:end].astype(np.int32),
+                            offsets[first:last + 1] - start),
+                           shape=(last - first, len(vocab)))
+        block.sum_duplicates()
+        blocks.append(block)
+        first = last
+
+    if not blocks:
+        return vocab, csr_matrix((len(offsets) - 1, len(vocab)), dtype=np.int32)
+    return vocab, vstack(blocks, format='csr')
+
+
+def count_frequencies(prefix):
+    """Same (texts, word_counts, doc_frequency) as frequency_analysis.count_words
+
+    Ids follow first occurrence, so word_counts are filled in the same order
+    (and most_common() breaks ties the same way).
+    """
+    import numpy as np
+
+    vocab, matrix = count_matrix(prefix)
+    counts = np.bincount(matrix.indices, weights=matrix.data, minlength=len(vocab)).astype(np.int64)
+    documents = np.bincount(matrix.indices, minlength=len(vocab))
+
+    word_counts = Counter(dict(zip(vocab, counts.tolist())))
+    doc_frequency = Counter(dict(zip(vocab, documents.tolist())))
+    return matrix.shape[0], word_counts, doc_frequency
@@ -0,0 +1,157 @@
+import os
+import csv
+import time
+import shutil
+import zlib
+from multiprocessing import Pool
+import numpy as np
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+MAX_HASH = np.uint64(0xFFFFFFFF)
+# Multiplier of the rolling hash of shingles (odd, 64 bit)
+SHINGLE_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingle_hashes(lemmas, shingle_size=SHINGLE_SIZE):
+    """64 bit hashes of the shingles (shingle_size consecutive lemmas) of the text, with repeats"""
+    ids = {}
+    codes = np.array([ids.setdefault(lemma, len(ids)) for lemma in lemmas], dtype=np.int64)
+    # Stable across processes and runs (unlike hash())
+    words = np.array([zlib.crc32(word.encode('utf-8')) << 32 | zlib.adler32(word.encode('utf-8')) for word in ids],
+                     dtype=np.uint64)[codes]
+
+    size = min(shingle_size, len(words))
+    hashes = np.zeros(len(words) - size + 1, dtype=np.uint64)
+    for i in range(size):
+        hashes = hashes * SHINGLE_BASE + words[i:len(words) - size + 1 + i]  # Wraps modulo 2^64
+    return hashes
+
+
+def minhash(shingles, num_perm=NUM_PERM, seed=1):
+    '''
+    MinHash signature (num_perm uint32 values) of the set of shingle hashes
+
+    One permutation hashing: a single hash of every shingle picks one of num_perm
+    bins and the minimum is kept in each bin, O(shingles) instead of
+    O(shingles x num_perm); empty bins take the value of the next non-empty bin
+    (densification). Repeated shingles do not change the minimums.
+    '''
+    mixer = np.uint64(np.random.default_rng(seed).integers(0, 2 ** 63, dtype=np.uint64) * 2 + 1)
+    hashes = shingles * mixer
+    signature = np.full(num_perm, MAX_HASH, dtype=np.uint64)
+    np.minimum.at(signature, (hashes % np.uint64(num_perm)).astype(np.int64), hashes >> np.uint64(32))
+
+    filled = np.flatnonzero(signature != MAX_HASH)
+    if 0 < len(filled) < num_perm:
+        signature = signature[filled[np.searchsorted(filled, np.arange(num_perm)) % len(filled)]]
+    return signature.astype(np.uint32)
+
+
+def file_signature(task):
+    """(filename, number of lemmas, signature or None for empty file), runs in the pool"""
+    filepath, shingle_size, num_perm, seed = task
+    with open(filepath, 'r', encoding='utf-8') as f:
+        lemmas = f.read().split()
+    if not lemmas:
+        return os.path.basename(filepath), 0, None
+    return os.path.basename(filepath), len(lemmas), minhash(shingle_hashes(lemmas, shingle_size), num_perm, seed)
+
+
+def lsh_parameters(num_perm, threshold):
+    """Bands and rows (bands * rows <= num_perm) with the S-curve threshold (1/bands)^(1/rows) closest to threshold"""
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1)]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+def candidate_pairs(signatures, bands, rows):
+    """Pairs of documents with the same rows of the signature in at least one band"""
+    pairs = set()
+    for band in range(bands):
+        buckets = {}
+        for doc, signature in enumerate(signatures):
+            buckets.setdefault(signature[band * rows:(band + 1) * rows].tobytes(), []).append(doc)
+        for docs in buckets.values():
+            for i in range(len(docs)):
+                for j in range(i + 1, len(docs)):
+                    pairs.add((docs[i], docs[j]))
+    return pairs
+
+
+def find(parents, doc):
+    while parents[doc] != doc:
+        parents[doc] = parents[parents[doc]]
+        doc = parents[doc]
+    return doc
+
+
+def find_duplicates(source_folder, threshold=0.8, shingle_size=SHINGLE_SIZE, num_perm=NUM_PERM,
+                    workers=None, seed=1):
+    '''
+    Clusters of near-duplicate texts: pairs with estimated Jaccard similarity
+    of lemma shingles >= threshold are joined (union-find)
+
+    Returns list of clusters, every cluster - list of (filename, lemmas, similarity
+    to the representative), the representative (longest text) first
+    '''
+    files = sorted(os.path.join(source_folder, filename) for filename in os.listdir(source_folder)
+                   if filename.endswith('.txt'))
+    start = time.time()
+    tasks = [(file, shingle_size, num_perm, seed) for file in files]
+    with Pool(workers) as pool:
+        results = [result for result in pool.imap(file_signature, tasks, chunksize=16) if result[2] is not None]
+    print(f"Signatures of {len(results)} files: {time.time() - start:.1f} s")
+
+    names = [result[0] for result in results]
+    lengths = [result[1] for result in results]
+    signatures = np.stack([result[2] for result in results]) if results else np.zeros((0, num_perm), np.uint32)
+
+    bands, rows = lsh_parameters(num_perm, threshold)
+    pairs = candidate_pairs(signatures, bands, rows)
+    parents = list(range(len(names)))
+    for i, j in pairs:
+        if np.mean(signatures[i] == signatures[j]) >= threshold:
+            parents[find(parents, i)] = find(parents, j)
+    print(f"{len(pairs)} candidate pairs ({bands} bands x {rows} rows): {time.time() - start:.1f} s")
+
+    groups = {}
+    for doc in range(len(names)):
+        groups.setdefault(find(parents, doc), []).append(doc)
+    clusters = []
+    for docs in groups.values():
+        if len(docs) < 2:
+            continue
+        docs.sort(key=lambda doc: (-lengths[doc], names[doc]))  # Keep the longest text
+        representative = signatures[docs[0]]
+        clusters.append([(names[doc], lengths[doc], float(np.mean(signatures[doc] == representative)))
+                         for doc in docs])
+    return sorted(clusters, key=lambda cluster: cluster[0][0])
+
+
+def deduplicate(source_folder, report_file='duplicates.tsv', duplicates_folder=None, threshold=0.8, **options):
+    '''
+    Write report of the clusters of near-duplicates (cluster, file, lemmas,
+    similarity, kept); if duplicates_folder is given, all texts except the
+    representative of each cluster are moved there (nothing is deleted)
+    '''
+    clusters = find_duplicates(source_folder, threshold, **options)
+    with open(report_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(['cluster', 'file', 'lemmas', 'similarity', 'kept'])
+        for number, cluster in enumerate(clusters):
+            for position, (name, lemmas, similarity) in enumerate(cluster):
+                writer.writerow([number, name, lemmas, f"{similarity:.3f}", int(position == 0)])
+
+    duplicates = [name for cluster in clusters for name, _, _ in cluster[1:]]
+    if duplicates_folder:
+        os.makedirs(duplicates_folder, exist_ok=True)
+        for name in duplicates:
+            shutil.move(os.path.join(source_folder, name), os.path.join(duplicates_folder, name))
+    print(f"{len(clusters)} clusters, {len(duplicates)} duplicates"
+          + (f" moved to {duplicates_folder}" if duplicates_folder else ""))
+    return clusters
+
+
+if __name__ == '__main__':
+    # Before make_corpus.py
+    deduplicate("annotated corpora + dglib", "duplicates.tsv", threshold=0.8)
@@ -0,0 +1,376 @@
+import os
+import re
+import time
+import random
+import sqlite3
+import hashlib
+import argparse
+import threading
+from urllib.parse import urljoin, urlparse
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+BASE_URL = 'https://www.dlib.si'
+# Public domain books in Slovenian, 100 records per page
+RESULTS_PATH = ("/results/?query=%27rel%3dknjige%40OR%40rel%3dvisoko%c5%a1olska+dela%27"
+                "&ftype=knjige&flanguage=slv&frights=PDM&pageSize=100&page={}")
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+# Worth trying again later
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def clean_title(title):
+    # Clean title from invalid characters
+    title = re.sub(r'[\\/*?:"<>|]', '', title)
+    if len(title) > 100:  # If too long
+        title = title[:100] + "..."
+    return title
+
+
+def clean_author(author):
+    # Clean author from invalid characters
+    author = re.sub(r'[\\/*?:"<>|]', '', author)
+    if len(author) > 50:  # If too long
+        author = author[:50] + "..."
+    return author
+
+
+def parse_results(html):
+    """List of (title, author, hrefs of the texts) of a results page"""
+    soup = BeautifulSoup(html, 'html.parser')
+    records = []
+    for record in soup.find_all('div', class_='record'):
+        # Extract title from Naslov class
+        naslov_element = record.find('div', class_='Naslov')
+        title_element = naslov_element.find('b') if naslov_element else None
+        title = title_element.text.strip() if title_element else "Unknown Title"
+
+        # Extract author from Avtorji class (first author without the years)
+        author = "Unknown Author"
+        avtorji_element = record.find('div', class_='Avtorji')
+        if avtorji_element:
+            author_links = avtorji_element.find_all('a')
+            if author_links:
+                author = re.sub(r'\s*\(.*\)', '', author_links[0].text.strip())
+
+        # Find all links to texts
+        txt_links = record.find_all('a', href=lambda href: href and 'TEXT' in href)
+        records.append((clean_title(title), clean_author(author), [link['href'] for link in txt_links]))
+    return records
+
+
+def open_queue(queue_path):
+    """Open (or create) SQLite queue of result pages and texts"""
+    conn = sqlite3.connect(queue_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            page INTEGER PRIMARY KEY,
+            status TEXT,
+            records INTEGER
+        )""")
+    # Validators and content hash of every downloaded text, for incremental sync
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS ledger (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            sha256 TEXT,
+            checked REAL,
+            changed REAL
+        )""")
+    conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS texts (
+            url TEXT PRIMARY KEY,
+            filename TEXT UNIQUE,
+            page INTEGER,
+            status TEXT,
+            attempts INTEGER,
+            error TEXT,
+            updated REAL
+        )""")
+    conn.commit()
+    return conn
+
+
+class RateLimiter:
+    """At most requests_per_second requests to every host, shared by all threads"""
+
+    def __init__(self, requests_per_second):
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self.next_time = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_time.get(host, now))
+            self.next_time[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class DlibCrawler:
+    '''
+    Download texts of the dLib results pages with a thread pool
+
+    State (done pages, queued, done and failed texts) is kept in SQLite,
+    so an interrupted run continues where it stopped
+    '''
+
+    def __init__(self, output_folder='texts', queue_path='dlib_queue.sqlite', base_url=BASE_URL,
+                 results_path=RESULTS_PATH, concurrency=8, requests_per_second=4,
+                 max_attempts=5, backoff=1.0, timeout=60):
+        '''
+        concurrency - parallel downloads (and pooled connections)
+
+        requests_per_second - limit for every host
+
+        max_attempts, backoff - retries of failed requests, waiting backoff * 2^attempt
+        seconds (or Retry-After of the server)
+        '''
+        self.output_folder = output_folder
+        self.queue_path = queue_path
+        self.base_url = base_url
+        self.results_path = results_path
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(requests_per_second)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+        os.makedirs(output_folder, exist_ok=True)
+
+    def request(self, url, headers=None):
+        """Response (200, or 304 for conditional headers), retrying with exponential backoff; raises the last error"""
+        for attempt in range(self.max_attempts):
+            self.rate_limiter.wait(url)
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                error, delay = e, None
+            else:
+                if response.status_code in (200, 304):
+                    return response
+                if response.status_code not in RETRY_STATUSES:
+                    raise requests.HTTPError(f"{response.status_code} for {url}")
+                error = requests.HTTPError(f"{response.status_code} for {url}")
+                delay = response.headers.get('Retry-After')
+                delay = float(delay) if delay and delay.isdigit() else None
+
+            if attempt + 1 < self.max_attempts:
+                time.sleep(delay if delay is not None else self.backoff * 2 ** attempt * (1 + random.random() / 2))
+        raise error
+
+    def fetch(self, url):
+        return self.request(url).content
+
+    def text_filename(self, conn, title, author, part, parts):
+        """Filename in "title (author).txt" format, suffix if the name is taken on disk or in the queue"""
+        if parts > 1:
+            filename = f"{title} ({author}) - {part}.txt"
+        else:
+            filename = f"{title} ({author}).txt"
+
+        base, ext = os.path.splitext(filename)
+        counter = 0
+        while (os.path.exists(os.path.join(self.output_folder, filename))
+               or conn.execute("SELECT 1 FROM texts WHERE filename=?", (filename,)).fetchone()):
+            counter += 1
+            filename = f"{base}_{counter}{ext}"
+        return filename
+
+    def enqueue_page(self, conn, page):
+        """Fetch results page and add its texts to the queue, returns number of records"""
+        records = parse_results(self.fetch(self.base_url + self.results_path.format(page)))
+        for title, author, hrefs in records:
+            for part, href in enumerate(hrefs, start=1):
+                url = urljoin(self.base_url, href)
+                if conn.execute("SELECT 1 FROM texts WHERE url=?", (url,)).fetchone():
+                    continue  # Already queued (e.g. same record on two pages)
+                conn.execute("INSERT INTO texts VALUES (?, ?, ?, 'pending', 0, NULL, ?)",
+                             (url, self.text_filename(conn, title, author, part, len(hrefs)), page, time.time()))
+        conn.execute("INSERT OR REPLACE INTO pages VALUES (?, 'done', ?)", (page, len(records)))
+        conn.commit()
+        return len(records)
+
+    def download(self, url, filename, etag=None, last_modified=None, sha256=None):
+        '''
+        Download single text (runs in the thread pool). With validators from the
+        ledger the request is conditional and an unchanged text is not written again
+
+        Returns (url, error, change, etag, last_modified, sha256),
+        change is 'new', 'changed' or 'unchanged'
+        '''
+        try:
+            save_path = os.path.join(self.output_folder, filename)
+            headers = {}
+            if sha256 and os.path.exists(save_path):
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+            response = self.request(url, headers)
+            if response.status_code == 304:
+                return url, None, 'unchanged', etag, last_modified, sha256
+
+            content = response.content
+            digest = hashlib.sha256(content).hexdigest()
+            etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+            if digest == sha256 and os.path.exists(save_path):
+                return url, None, 'unchanged', etag, last_modified, digest  # Server does not support validators
+
+            with open(save_path + '.part', 'wb') as f:
+                f.write(content)
+            os.replace(save_path + '.part', save_path)
+            return url, None, 'changed' if sha256 else 'new', etag, last_modified, digest
+        except Exception as e:
+            return url, str(e), None, None, None, None
+
+    def pending_texts(self, conn, in_flight, retry_failed=False):
+        """Queued texts not downloading now, failed ones (below max_attempts runs) if retry_failed"""
+        query = ("SELECT texts.url, filename, etag, last_modified, sha256 FROM texts "
+                 "LEFT JOIN ledger ON texts.url = ledger.url WHERE ")
+        rows = conn.execute(query + "status='pending'").fetchall()
+        if retry_failed:
+            rows += conn.execute(query + "status='failed' AND attempts < ?", (self.max_attempts,)).fetchall()
+        return [row for row in rows if row[0] not in in_flight]
+
+    def finish(self, conn, done):
+        """Record finished downloads (only the main thread writes to the queue)"""
+        for future in done:
+            url, error, change, etag, last_modified, sha256 = future.result()
+            now = time.time()
+            conn.execute("UPDATE texts SET status=?, attempts=attempts + 1, error=?, updated=? WHERE url=?",
+                         ('failed' if error else 'done', error, now, url))
+            if error:
+                print(f"Failed to download from {url}: {error}")
+                continue
+            conn.execute("""
+                INSERT INTO ledger VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET etag=excluded.etag, last_modified=excluded.last_modified,
+                    sha256=excluded.sha256, checked=excluded.checked,
+                    changed=CASE WHEN ? = 'unchanged' THEN ledger.changed ELSE excluded.changed END""",
+                         (url, etag, last_modified, sha256, now, now, change))
+            self.changes[change] += 1
+            if change != 'unchanged':
+                print(f"Downloaded: {url}")
+        conn.commit()
+
+    def run(self, pages=range(1, 64)):
+        '''
+        pages - result pages to walk (pages already done in the queue are skipped,
+        walking stops at the first page without records)
+
+        Returns counts of texts by status
+        '''
+        conn = open_queue(self.queue_path)
+        self.changes = Counter()
+        done_pages = dict(conn.execute("SELECT page, records FROM pages WHERE status='done'").fetchall())
+        in_flight = {}  # url -> future
+
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            def submit_pending(retry_failed=False):
+                for url, *text in self.pending_texts(conn, in_flight.keys(), retry_failed):
+                    in_flight[url] = pool.submit(self.download, url, *text)
+
+            submit_pending(retry_failed=True)  # Left from the previous run
+            for page in pages:
+                if page in done_pages:
+                    if done_pages[page] == 0:
+                        break  # The end of the results was reached before
+                    continue
+                try:
+                    records = self.enqueue_page(conn, page)
+                except Exception as e:
+                    conn.execute("INSERT OR REPLACE INTO pages VALUES (?, 'failed', NULL)", (page,))
+                    conn.commit()
+                    print(f"Failed to fetch page {page}: {e}")
+                    continue
+                submit_pending()
+                done = [future for future in in_flight.values() if future.done()]
+                self.finish(conn, done)
+                for future in done:
+                    in_flight.pop(future.result()[0])
+                if records == 0:
+                    break
+
+            while in_flight:
+                done, _ = wait(in_flight.values(), return_when=FIRST_COMPLETED)
+                self.finish(conn, done)
+                for future in done:
+                    in_flight.pop(future.result()[0])
+
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM texts GROUP BY status").fetchall())
+        conn.close()
+        print(f"Texts: {counts}, this run: {dict(self.changes)}")
+        return counts
+
+    def sync(self, pages=range(1, 64), delta_path='delta.txt', resume=False):
+        '''
+        Walk the result pages again and check every known text with a conditional
+        request (ETag / Last-Modified, then content hash); unchanged texts are
+        not downloaded or written. New and changed files are listed in delta_path
+        (one path per line, e.g. for lemmatize_optimized.py --files-from).
+
+        resume - continue an interrupted sync instead of starting a new one
+
+        Returns list of new and changed files
+        '''
+        conn = open_queue(self.queue_path)
+        if not resume or not conn.execute("SELECT 1 FROM state WHERE key='sync_started'").fetchone():
+            conn.execute("UPDATE pages SET status='stale'")
+            conn.execute("UPDATE texts SET status='pending', attempts=0 WHERE status IN ('done', 'failed')")
+            conn.execute("INSERT OR REPLACE INTO state VALUES ('sync_started', ?)", (time.time(),))
+            conn.commit()
+        conn.close()
+
+        self.run(pages)
+        return self.write_delta(delta_path)
+
+    def write_delta(self, delta_path, since=None):
+        """Write files new or changed since the start of the last sync (or since time), returns them"""
+        conn = open_queue(self.queue_path)
+        if since is None:
+            row = conn.execute("SELECT value FROM state WHERE key='sync_started'").fetchone()
+            since = row[0] if row else 0
+        rows = conn.execute("SELECT filename FROM texts JOIN ledger ON texts.url = ledger.url "
+                            "WHERE status='done' AND changed >= ? ORDER BY filename", (since,)).fetchall()
+        conn.close()
+
+        files = [os.path.join(self.output_folder, filename) for filename, in rows]
+        with open(delta_path, 'w', encoding='utf-8') as f:
+            f.writelines(file + '\n' for file in files)
+        print(f"{len(files)} new or changed files listed in {delta_path}")
+        return files
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Download public domain Slovenian books from dLib")
+    parser.add_argument('--output', default='texts')
+    parser.add_argument('--queue', default='dlib_queue.sqlite')
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--pages', type=int, default=63)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rate', type=float, default=4, help="requests per second")
+    parser.add_argument('--sync', action='store_true', help="check known texts again, download only new and changed")
+    parser.add_argument('--resume', action='store_true', help="continue an interrupted sync")
+    parser.add_argument('--delta', default='delta.txt', help="list of new and changed files of the sync")
+    args = parser.parse_args()
+
+    crawler = DlibCrawler(args.output, args.queue, args.base_url, concurrency=args.concurrency,
+                          requests_per_second=args.rate)
+    if args.sync:
+        crawler.sync(range(1, args.pages + 1), args.delta, args.resume)
+    else:
+        crawler.run(range(1, args.pages + 1))
@@ -3,39 +3,50 @@ import glob
 import time
 from tqdm import tqdm
 import classla
-import chardet
 import re
+from slv_reader import read_slovenian_file
+from run_manifest import open_manifest, pending_files, pipeline_version, record_run
+
+# Bump when the lemma rules in doc_lemmas change, so all files are redone
+RULES_VERSION = '1'
 
 # Initialize classla once 
 classla.download('sl')  
 nlp = classla.Pipeline('sl', processors='tokenize,lemma,pos')
 
 
-def read_slovenian_file(file_path):
-    """Read the file with encoding detection"""
-    # Detect encoding
-    with open(file_path, 'rb') as f:
-        raw_data = f.read(50000)  # Check first 50KB
-        encoding = chardet.detect(raw_data)['encoding']
+# Chunks are cut at paragraph breaks, or at sentence ends for very long paragraphs
+PARAGRAPH_BREAK = re.compile(r'\n[^\S\n]*\n\s*')
+SENTENCE_END = re.compile(r'[.!?…]+["\'»«)]*\s+')
 
-    # Read with detected encoding (fallback to latin-1)
-    try:
-        with open(file_path, 'r', encoding=encoding) as f:
-            text = f.read()
-    except:
-        with open(file_path, 'r', encoding='latin-1') as f:
-            text = f.read()
 
-    # Clean common artifacts
-    text = re.sub(r'[\x00-\x08\x0B-\x1F\x7F-\x9F]', ' ', text)  # Remove control chars
-    return text.strip()
+def find_cut(text, start, end):
+    """Find the last paragraph (or sentence, or word) boundary in text[start:end]"""
+    for pattern in (PARAGRAPH_BREAK, SENTENCE_END):
+        cut = None
+        for match in pattern.finditer(text, start, end):
+            cut = match.end()
+        if cut is not None and cut > start:
+            return cut
+    cut = text.rfind(' ', start, end)
+    return cut + 1 if cut > start else end
 
 
-def prepare_slv_text(input_file, output_file):
-    """Process a single Slovenian text file, saving lemmas with rules."""
+def iter_text_chunks(text, chunk_size):
+    """Split text into chunks of at most chunk_size characters"""
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end >= len(text):
+            yield text[start:]
+            return
+        cut = find_cut(text, start, end)
+        yield text[start:cut]
+        start = cut
 
-    text = read_slovenian_file(input_file)
-    doc = nlp(text)
+
+def doc_lemmas(doc):
+    """Get lemmas of a classla document, applying rules"""
     lemmas = []
 
     # Get lemma and pos within sentence context
@@ -55,25 +66,60 @@ def prepare_slv_text(input_file, output_file):
                 lemma = "number1"
 
             lemmas.append(lemma)
+    return lemmas
+
+
+def prepare_slv_text(input_file, output_file, chunk_size=None):
+    """Process a single Slovenian text file, saving lemmas with rules.
+
+    With chunk_size the text is lemmatized chunk by chunk and lemmas are
+    appended to the output, so memory depends on chunk size, not book size.
+    """
+    text = read_slovenian_file(input_file)
+    chunks = iter_text_chunks(text, chunk_size) if chunk_size else [text]
 
     with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(" ".join(lemmas))
+        written = False
+        for chunk in chunks:
+            if not chunk.strip():
+                continue
+            lemmas = doc_lemmas(nlp(chunk))
+            if lemmas:
+                # Same output as " ".join over the whole book
+                f.write((" " if written else "") + " ".join(lemmas))
+                written = True
+
 
+def prepare_slv_texts_from_folder(input_folder, output_folder, chunk_size=None,
+                                  manifest_path='lemmatize_manifest.sqlite'):
+    """Process all .txt files in a folder, saving preprocessed versions.
 
-def prepare_slv_texts_from_folder(input_folder, output_folder):
-    """Process all .txt files in a folder, saving preprocessed versions."""
+    Files already done (same content, pipeline and rules version in the
+    manifest) are skipped, source files are kept.
+    """
     os.makedirs(output_folder, exist_ok=True)
     files = sorted(glob.glob(os.path.join(input_folder, '*.txt')))  # Only .txt files
+    manifest = open_manifest(manifest_path)
+    pipeline = pipeline_version('tokenize,lemma,pos', chunk_size=chunk_size)
+    files, skipped = pending_files(manifest, files, pipeline, RULES_VERSION)
+    print(f"{skipped} files already done")
 
     start_time = time.time()
-    for file in tqdm(files, desc="Processing files", unit="file"):
+    for file, key in tqdm(files, desc="Processing files", unit="file"):
         filename = os.path.basename(file)
         output_file = os.path.join(output_folder, f"PREPROCESSED_{filename}")
-        prepare_slv_text(file, output_file)
-        # Delete the original file after successful processing
-        os.remove(file)
+        started = time.time()
+        try:
+            prepare_slv_text(file, output_file, chunk_size)
+            success = True
+        except Exception as e:
+            print(f"Error processing {file}: {str(e)}")
+            success = False
+        record_run(manifest, key, file, output_file, 'done' if success else 'failed', started, time.time() - started)
+    manifest.close()
 
     print(f"\nTotal time: {time.time() - start_time:.2f} seconds")
 
 
-prepare_slv_texts_from_folder("texts", "lemmatized")
\ No newline at end of file
+# Lemmatize by chunks of ~200K characters
+prepare_slv_texts_from_folder("texts", "lemmatized", chunk_size=200_000)
\ No newline at end of file
@@ -1,53 +1,42 @@
 import os
 import glob
 import time
+import signal
+import argparse
+import multiprocessing as mp
 from tqdm import tqdm
 import classla
-import chardet
-import re
-
-# Initialize classla once
-classla.download('sl', verbose=False) 
-# Pipeline configs with batched processing 
-nlp = classla.Pipeline('sl', processors='tokenize,lemma,pos', 
-                      use_gpu=False,
-                      tokenize_batch_size=1000,
-                      lemma_batch_size=1000,
-                      pos_batch_size=1000)
-
-
-def read_slovenian_file(file_path):
-    """Optimized file reader with encoding detection"""
-    # Encodings used for Slovenian
-    encodings = ['utf-8', 'windows-1250', 'latin-1']
-    try:
-        # Detect encoding
-        with open(file_path, 'rb') as f:
-            raw = f.read(50000) # Check first 50KB
-            detected = chardet.detect(raw)['encoding']
-            if detected: encodings.insert(0, detected)
-            
-        for enc in encodings:
-            # Read with detected encoding
-            try:
-                with open(file_path, 'r', encoding=enc) as f:
-                    text = f.read()
-                return re.sub(r'[\x00-\x08\x0B-\x1F\x7F-\x9F]', ' ', text).strip()
-            except:
-                continue
-        return raw.decode('ascii', errors='replace').strip()
-    
-    except Exception as e:
-        print(f"Read error {file_path}: {str(e)}")
-        return ""
+from slv_reader import read_slovenian_file
+from run_manifest import open_manifest, pending_files, pipeline_version, record_run
+
+# Bump when the lemma rules in process_file change, so all files are redone
+RULES_VERSION = '1'
+
+PROCESSORS = 'tokenize,lemma,pos'
+# Pipeline configs with batched processing
+PIPELINE_CONFIG = dict(use_gpu=False,
+                       tokenize_batch_size=1000,
+                       lemma_batch_size=1000,
+                       pos_batch_size=1000)
+
+# Pipeline of the current process (one warm pipeline per worker)
+nlp = None
+
+
+def load_pipeline():
+    return classla.Pipeline('sl', processors=PROCESSORS, **PIPELINE_CONFIG)
+
+
+def output_path(input_file, output_folder):
+    return os.path.join(output_folder, f"PREPROCESSED_{os.path.basename(input_file)}")
 
 
 def process_file(input_file, output_folder):
-    """Process single file using global nlp pipeline"""
+    """Process single file using global nlp pipeline, returns status 'done', 'empty' or 'failed'"""
     try:
         text = read_slovenian_file(input_file)
         if not text.strip():
-            return False
+            return 'empty'  # Nothing to lemmatize, not retried
             
         doc = nlp(text)
         lemmas = []
@@ -67,37 +56,126 @@ def process_file(input_file, output_folder):
                 }.get(pos, lemma)
                 lemmas.append(lemma)
         
-        output_file = os.path.join(output_folder, f"PREPROCESSED_{os.path.basename(input_file)}")
+        output_file = output_path(input_file, output_folder)
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(" ".join(lemmas))
             
-        return True
+        return 'done'
     except Exception as e:
         print(f"Error processing {input_file}: {str(e)}")
-        return False
+        return 'failed'
+
+
+class FileTimeout(Exception):
+    """Processing of a single file took too long"""
+
+
+def raise_timeout(signum, frame):
+    raise FileTimeout("timed out")
 
 
-def process_files_sequential(files, output_folder):
+def process_file_with_timeout(task):
+    """Process single file, giving up after timeout seconds (None - no limit)"""
+    input_file, output_folder, timeout = task
+    started = time.time()
+    if timeout:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        # FileTimeout is reported by process_file as an ordinary error
+        status = process_file(input_file, output_folder)
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return input_file, status, started, time.time() - started
+
+
+def init_worker(threads):
+    """Load own pipeline once per worker process"""
+    global nlp
+    import torch
+    torch.set_num_threads(threads)  # Do not oversubscribe cores
+    nlp = load_pipeline()
+
+
+def process_files_sequential(files, output_folder, manifest, timeout=None):
     """Process files sequentially with progress bar"""
+    global nlp
+    if nlp is None:
+        nlp = load_pipeline()
+
+    success = 0
+    for file, key in tqdm(files, desc="Processing"):
+        _, status, started, seconds = process_file_with_timeout((file, output_folder, timeout))
+        record_run(manifest, key, file, output_path(file, output_folder), status, started, seconds)
+        success += status != 'failed'
+    return success
+
+
+def process_files_parallel(files, output_folder, manifest, workers, timeout=None):
+    """Process files in a pool of workers, largest files first"""
+    # Largest files first, so the pool is not waiting for one big book at the end
+    files = sorted(files, key=lambda item: os.path.getsize(item[0]), reverse=True)
+    keys = dict(files)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    tasks = [(file, output_folder, timeout) for file, _ in files]
+
     success = 0
-    for file in tqdm(files, desc="Processing"):
-        if process_file(file, output_folder):
-            success += 1
-            os.remove(file)  # Only remove if successful
+    ctx = mp.get_context('spawn')
+    with ctx.Pool(workers, initializer=init_worker, initargs=(threads,)) as pool:
+        results = pool.imap_unordered(process_file_with_timeout, tasks)
+        for file, status, started, seconds in tqdm(results, total=len(tasks), desc="Processing"):
+            # Only the parent writes to the manifest
+            record_run(manifest, keys[file], file, output_path(file, output_folder), status, started, seconds)
+            success += status != 'failed'
+            if status == 'failed':
+                print(f"Failed {file} after {seconds:.0f} s")
     return success
 
 
-def prepare_slv_texts_from_folder(input_folder, output_folder):
-    """Main processing function"""
+def prepare_slv_texts_from_folder(input_folder, output_folder, workers=1, timeout=None,
+                                  manifest_path='lemmatize_manifest.sqlite', files_from=None):
+    """Main processing function
+
+    Progress is kept in the manifest, source files are never removed: re-runs
+    skip files already done (or empty) with the same content, pipeline and rules
+    version and retry the failed ones.
+
+    files_from - file with paths to process (one per line, e.g. delta.txt of
+    dlib_crawler.py sync) instead of all files of input_folder
+    """
     os.makedirs(output_folder, exist_ok=True)
-    files = sorted(glob.glob(os.path.join(input_folder, '*.txt'))) # Only .txt files
-    print(f"Found {len(files)} files to process")
+    if files_from:
+        with open(files_from, 'r', encoding='utf-8') as f:
+            files = [line.rstrip('\n') for line in f if line.strip().endswith('.txt')]
+    else:
+        files = sorted(glob.glob(os.path.join(input_folder, '*.txt'))) # Only .txt files
+    manifest = open_manifest(manifest_path)
+    files, skipped = pending_files(manifest, files, pipeline_version(PROCESSORS, **PIPELINE_CONFIG), RULES_VERSION)
+    print(f"Found {len(files)} files to process ({skipped} already done)")
     
     start_time = time.time()
-    success = process_files_sequential(files, output_folder)
+    if workers > 1:
+        success = process_files_parallel(files, output_folder, manifest, workers, timeout)
+    else:
+        success = process_files_sequential(files, output_folder, manifest, timeout)
+    manifest.close()
     
     print(f"\nProcessed {success}/{len(files)} files successfully")
     print(f"Time taken: {(time.time()-start_time)/60:.1f} minutes")
 
 
-prepare_slv_texts_from_folder("texts", "lemmatized")
\ No newline at end of file
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes, each with own pipeline")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="seconds after which a single file is given up")
+    parser.add_argument('--files-from', default=None,
+                        help="list of files to process (e.g. delta.txt of the crawler sync)")
+    args = parser.parse_args()
+
+    # Initialize classla once
+    classla.download('sl', verbose=False)
+    prepare_slv_texts_from_folder("texts", "lemmatized", workers=args.workers, timeout=args.timeout,
+                                  files_from=args.files_from)
\ No newline at end of file
@@ -0,0 +1,76 @@
+import os
+import sqlite3
+import hashlib
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """SHA-256 of file content"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pipeline_version(processors, **config):
+    """Version string of the classla pipeline used for lemmatization"""
+    import classla
+    version = getattr(classla, '__version__', 'unknown')
+    options = ','.join(f"{key}={config[key]}" for key in sorted(config))
+    return f"classla-{version}:{processors}:{options}"
+
+
+def open_manifest(manifest_path):
+    """Open (or create) SQLite manifest of lemmatization runs"""
+    conn = sqlite3.connect(manifest_path)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            input_hash TEXT,
+            pipeline_version TEXT,
+            rules_version TEXT,
+            input_path TEXT,
+            output_path TEXT,
+            status TEXT,
+            started REAL,
+            seconds REAL,
+            PRIMARY KEY (input_hash, pipeline_version, rules_version)
+        )""")
+    conn.commit()
+    return conn
+
+
+def is_done(conn, key):
+    """Check if input with this (hash, pipeline, rules) key was processed and its output still exists
+
+    Empty inputs (status 'empty') have no output and are final as well
+    """
+    row = conn.execute(
+        "SELECT status, output_path FROM runs WHERE input_hash=? AND pipeline_version=? AND rules_version=? "
+        "AND status IN ('done', 'empty')",
+        key).fetchone()
+    return row is not None and (row[0] == 'empty' or os.path.exists(row[1]))
+
+
+def record_run(conn, key, input_path, output_path, status, started, seconds):
+    """Save result of processing a single file, status 'done', 'empty' (nothing to lemmatize) or 'failed'"""
+    conn.execute(
+        "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (*key, input_path, output_path, status, started, seconds))
+    conn.commit()
+
+
+def pending_files(conn, files, pipeline, rules):
+    """Split files into (file, key) pairs to process and number of skipped ones
+
+    Files are keyed by content hash, so renamed files are not processed again,
+    while changed content, pipeline or rules version gives a new key.
+    """
+    pending = []
+    skipped = 0
+    for file in files:
+        key = (file_hash(file), pipeline, rules)
+        if is_done(conn, key):
+            skipped += 1
+        else:
+            pending.append((file, key))
+    return pending, skipped
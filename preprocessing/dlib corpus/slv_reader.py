@@ -0,0 +1,65 @@
+import os
+import re
+import chardet
+
+# Encodings used for Slovenian, tried when UTF-8 and detection fail
+FALLBACK_ENCODINGS = ['windows-1250', 'latin-1']
+
+# ASCII control chars (all but \t and \n) become spaces, same in UTF-8 and 8-bit encodings
+CONTROL_BYTES = bytes(range(0x00, 0x09)) + bytes(range(0x0B, 0x20)) + b'\x7f'
+CONTROL_TABLE = bytes.maketrans(CONTROL_BYTES, b' ' * len(CONTROL_BYTES))
+# C1 control chars only appear after decoding (latin-1, UTF-8)
+C1_CHARS = re.compile('[\x80-\x9f]')
+CONTROL_CHARS = re.compile('[\x00-\x08\x0B-\x1F\x7F-\x9F]')
+UTF16_BOMS = (b'\xff\xfe', b'\xfe\xff')
+
+# Last encoding detected for non UTF-8 files in each folder
+folder_encodings = {}
+
+
+def candidate_encodings(raw, folder):
+    """Encodings to try for non UTF-8 bytes, running detection only if needed"""
+    if folder in folder_encodings:
+        yield folder_encodings[folder]
+    detected = chardet.detect(raw[:50000])['encoding']  # Check first 50KB
+    if detected:
+        yield detected
+    yield from FALLBACK_ENCODINGS
+
+
+def decode_slovenian_bytes(raw, folder=None):
+    """Decode bytes of a text: strict UTF-8 first, then detected encodings"""
+    try:
+        return raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        pass
+
+    for encoding in candidate_encodings(raw, folder):
+        try:
+            text = raw.decode(encoding)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        folder_encodings[folder] = encoding
+        return text
+    return raw.decode('latin-1')  # Never reached, latin-1 decodes everything
+
+
+def read_slovenian_file(file_path):
+    """Read the file once, decode it and replace control chars with spaces"""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+
+    # Control bytes can not be replaced before decoding UTF-16
+    if raw[:2] in UTF16_BOMS:
+        text = raw.decode('utf-16').replace('\r\n', '\n').replace('\r', '\n')
+        return CONTROL_CHARS.sub(' ', text).strip()
+
+    # Same newlines as reading in text mode
+    if b'\r' in raw:
+        raw = raw.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    raw = raw.translate(CONTROL_TABLE)
+
+    text = decode_slovenian_bytes(raw, os.path.dirname(os.path.abspath(file_path)))
+    if C1_CHARS.search(text):
+        text = C1_CHARS.sub(' ', text)
+    return text.strip()
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from dlib_crawler import DlibCrawler, open_queue
+
+PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pages')
+RESULTS_PATH = '/results/?page={}'
+
+
+def read_page(name):
+    with open(os.path.join(PAGES, name), 'rb') as f:
+        return f.read()
+
+
+class StandIn:
+    '''
+    Local dLib: result pages by number and texts by path
+
+    texts - path -> list of responses (status, body, headers), one per request,
+    the last one repeats; with an ETag header If-None-Match is answered with 304
+    '''
+
+    def __init__(self):
+        self.pages = {1: read_page('results_1.html'), 2: read_page('results_2.html')}
+        self.texts = {}
+        self.hits = Counter()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.hits[self.path] += 1
+                if self.path.startswith('/results/'):
+                    page = int(self.path.rsplit('=', 1)[1])
+                    self.reply(200, stand_in.pages.get(page, read_page('results_empty.html')), {})
+                    return
+                responses = stand_in.texts.get(self.path, [(404, b'', {})])
+                status, body, headers = responses[min(stand_in.hits[self.path], len(responses)) - 1]
+                if headers.get('ETag') and self.headers.get('If-None-Match') == headers['ETag']:
+                    status, body = 304, b''
+                self.reply(status, body, headers)
+
+            def reply(self, status, body, headers):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def text(self, doc, *responses):
+        self.texts[f'/stream/URN:NBN:SI:{doc}/TEXT/'] = list(responses)
+
+    def ok(self, doc, body, **headers):
+        self.text(doc, (200, body, {key.replace('_', '-'): value for key, value in headers.items()}))
+
+
+@pytest.fixture
+def stand_in():
+    stand_in = StandIn()
+    for doc in ('doc-A1', 'doc-A2', 'doc-B1', 'doc-B2', 'doc-C1', 'doc-D1'):
+        stand_in.ok(doc, f"Besedilo {doc}".encode('utf-8'))
+    yield stand_in
+    stand_in.server.shutdown()
+    stand_in.server.server_close()
+
+
+@pytest.fixture
+def crawler(stand_in, tmp_path):
+    return DlibCrawler(str(tmp_path / 'texts'), str(tmp_path / 'queue.sqlite'), stand_in.base_url,
+                       RESULTS_PATH, concurrency=4, requests_per_second=0, max_attempts=3, backoff=0.01,
+                       timeout=5)
+
+
+def texts(crawler):
+    conn = sqlite3.connect(crawler.queue_path)
+    rows = conn.execute("SELECT url, filename, status, attempts FROM texts").fetchall()
+    conn.close()
+    return {url.rsplit(':', 1)[1].split('/')[0]: (filename, status, attempts) for url, filename, status, attempts in rows}
+
+
+def test_duplicate_titles_and_parts(crawler):
+    assert crawler.run(range(1, 10)) == {'done': 6}
+    names = {doc: filename for doc, (filename, _, _) in texts(crawler).items()}
+    assert names['doc-A1'] == 'Deseti brat (Jurčič, Josip).txt'
+    assert names['doc-A2'] == 'Deseti brat (Jurčič, Josip)_1.txt'
+    assert names['doc-B1'] == 'Zbrani spisi knjiga 1 (Levstik, Fran) - 1.txt'
+    assert names['doc-B2'] == 'Zbrani spisi knjiga 1 (Levstik, Fran) - 2.txt'
+    assert names['doc-D1'] == 'Izgubljena knjiga (Unknown Author).txt'
+    with open(os.path.join(crawler.output_folder, names['doc-A2']), encoding='utf-8') as f:
+        assert f.read() == 'Besedilo doc-A2'
+
+
+def test_stops_at_empty_page(crawler, stand_in):
+    crawler.run(range(1, 10))
+    assert stand_in.hits[RESULTS_PATH.format(3)] == 1
+    assert stand_in.hits[RESULTS_PATH.format(4)] == 0
+
+
+def test_retry_after(crawler, stand_in):
+    stand_in.text('doc-C1', (503, b'', {'Retry-After': '0'}), (200, b'Besedilo doc-C1', {}))
+    crawler.backoff = 60  # Only Retry-After keeps the test short
+    start = time.time()
+    crawler.run(range(1, 10))
+    assert time.time() - start < 30
+    assert texts(crawler)['doc-C1'][1:] == ('done', 1)
+    assert stand_in.hits['/stream/URN:NBN:SI:doc-C1/TEXT/'] == 2
+
+
+def test_not_found_fails(crawler, stand_in):
+    del stand_in.texts['/stream/URN:NBN:SI:doc-D1/TEXT/']
+    assert crawler.run(range(1, 10)) == {'done': 5, 'failed': 1}
+    assert texts(crawler)['doc-D1'][1:] == ('failed', 1)
+    assert stand_in.hits['/stream/URN:NBN:SI:doc-D1/TEXT/'] == 1  # 404 is not retried
+    assert not os.path.exists(os.path.join(crawler.output_folder, 'Izgubljena knjiga (Unknown Author).txt'))
+
+
+def test_resume(crawler, stand_in):
+    # Interrupted after page 1 was queued, before its texts were downloaded
+    conn = open_queue(crawler.queue_path)
+    crawler.enqueue_page(conn, 1)
+    conn.close()
+    assert crawler.run(range(1, 2)) == {'done': 4}
+    assert stand_in.hits[RESULTS_PATH.format(1)] == 1  # Done pages are not fetched again
+
+    # A text failed in the previous run is tried again at the start of the next one
+    stand_in.text('doc-C1', (404, b'', {}), (200, b'Besedilo doc-C1', {}))
+    assert crawler.run(range(1, 3)) == {'done': 5, 'failed': 1}
+    assert crawler.run(range(1, 10)) == {'done': 6}
+    assert texts(crawler)['doc-C1'][1:] == ('done', 2)
+    assert stand_in.hits[RESULTS_PATH.format(1)] == 1
+    assert stand_in.hits[RESULTS_PATH.format(2)] == 1
+    assert stand_in.hits['/stream/URN:NBN:SI:doc-A1/TEXT/'] == 1  # Done texts are not downloaded again
+
+
+def test_sync(crawler, stand_in, tmp_path):
+    stand_in.ok('doc-A1', b'Besedilo doc-A1', ETag='"a1"')
+    stand_in.ok('doc-B1', b'Besedilo doc-B1', Last_Modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    crawler.run(range(1, 10))
+    names = {doc: filename for doc, (filename, _, _) in texts(crawler).items()}
+
+    stand_in.hits.clear()
+    stand_in.ok('doc-C1', 'Besedilo doc-C1, popravljeno'.encode('utf-8'))  # Changed
+    stand_in.ok('doc-E1', b'Besedilo doc-E1')  # New
+    stand_in.pages[2] = read_page('results_2_sync.html')
+    delta_path = str(tmp_path / 'delta.txt')
+    files = crawler.sync(range(1, 10), delta_path)
+
+    expected = sorted(os.path.join(crawler.output_folder, name)
+                      for name in (names['doc-C1'], 'Martin Krpan (Levstik, Fran).txt'))
+    assert files == expected
+    with open(delta_path, encoding='utf-8') as f:
+        assert f.read() == ''.join(file + '\n' for file in expected)
+    assert crawler.changes == {'unchanged': 5, 'changed': 1, 'new': 1}
+    # 304 for the ETag, the others (same hash) were downloaded but not written
+    assert stand_in.hits['/stream/URN:NBN:SI:doc-A1/TEXT/'] == 1
+    with open(os.path.join(crawler.output_folder, names['doc-C1']), encoding='utf-8') as f:
+        assert f.read() == 'Besedilo doc-C1, popravljeno'
+
+    # Nothing changed since: empty delta
+    assert crawler.sync(range(1, 10), delta_path) == []
@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from run_manifest import open_manifest, pending_files, record_run
+
+
+def test_empty_and_done_are_final(tmp_path):
+    files = []
+    for name, text in (('prazno', ' \n'), ('knjiga', 'Besedilo'), ('napaka', 'Drugo besedilo')):
+        files.append(str(tmp_path / f'{name}.txt'))
+        with open(files[-1], 'w', encoding='utf-8') as f:
+            f.write(text)
+    output_file = str(tmp_path / 'PREPROCESSED_knjiga.txt')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write('besedilo')
+
+    manifest = open_manifest(str(tmp_path / 'manifest.sqlite'))
+    pending, skipped = pending_files(manifest, files, 'pipeline', '1')
+    assert skipped == 0
+    keys = dict(pending)
+    record_run(manifest, keys[files[0]], files[0], str(tmp_path / 'PREPROCESSED_prazno.txt'), 'empty', 0, 0)
+    record_run(manifest, keys[files[1]], files[1], output_file, 'done', 0, 0)
+    record_run(manifest, keys[files[2]], files[2], str(tmp_path / 'PREPROCESSED_napaka.txt'), 'failed', 0, 0)
+
+    # Only the failed file is tried again; the empty one has no output and is not retried
+    assert pending_files(manifest, files, 'pipeline', '1') == ([(files[2], keys[files[2]])], 2)
+    # A done file whose output is gone is redone
+    os.remove(output_file)
+    assert [file for file, _ in pending_files(manifest, files, 'pipeline', '1')[0]] == [files[1], files[2]]
+    # New rules version: everything again
+    assert pending_files(manifest, files, 'pipeline', '2')[1] == 0
+    manifest.close()
@@ -1,50 +1,45 @@
 import os
-
-
-allowed_tokens = {"person1", "proper1", "number1"}
-slovenian_chars = set("abcčdefghijklmnoprsštuvzžABCČDEFGHIJKLMNOPRSŠTUVZŽ")  # Slovenian alphabet only
-
-
-def is_valid_lemma(lemma):
-    """Check if lemma is allowed token or Slovenian"""
-    # Check for allowed special tokens
-    if lemma in allowed_tokens:
-        return True
-    
-    # Must contain only slovenian letters
-    if not all(c in slovenian_chars for c in lemma.lower()):
-        return False
-    
-    return True
+from contextlib import nullcontext
+from slovenian_lemmas import clean_lemmas
+from binary_corpus import BinaryCorpusWriter
 
 
 def clean_file_content(content):
     """Remove invalid lemmas"""
-    lemmas = content.split()
-    cleaned_lemmas = [lemma for lemma in lemmas if is_valid_lemma(lemma)]
-    return ' '.join(cleaned_lemmas)
+    return ' '.join(clean_lemmas(content.split()))
 
 
-def process_files(source_folder, corpus_file):
-    """Process all files and build corpus with cleaned"""
+def process_files(source_folder, corpus_file, binary_prefix=None, word_counts=None, doc_frequency=None):
+    '''
+    Process all files and build corpus with cleaned (and its binary version if binary_prefix is given)
+
+    word_counts, doc_frequency - Counters updated with the words of every text
+    and the number of texts containing each word (corpus_pipeline.py)
+    '''
     valid_files = 0
     cleaned_files = 0
 
-    
-    with open(corpus_file, 'w', encoding='utf-8') as corpus:
+    binary = BinaryCorpusWriter(binary_prefix) if binary_prefix else nullcontext()
+    with open(corpus_file, 'w', encoding='utf-8') as corpus, binary:
         for filename in os.listdir(source_folder):
             if not filename.endswith('.txt'):
                 continue
                 
             filepath = os.path.join(source_folder, filename)
             with open(filepath, 'r', encoding='utf-8') as f:
-                original_content = f.read().strip()
+                original_lemmas = f.read().split()
             
-            cleaned_content = clean_file_content(original_content)
+            cleaned_lemmas = clean_lemmas(original_lemmas)
             
-            if cleaned_content:  # To be safe
-                corpus.write(cleaned_content + '\n')
-                if len(cleaned_content.split()) == len(original_content.split()):
+            if cleaned_lemmas:  # To be safe
+                corpus.write(' '.join(cleaned_lemmas) + '\n')
+                if binary_prefix:
+                    binary.add_text(cleaned_lemmas)
+                if word_counts is not None:
+                    word_counts.update(cleaned_lemmas)
+                if doc_frequency is not None:
+                    doc_frequency.update(set(cleaned_lemmas))  # once per text
+                if len(cleaned_lemmas) == len(original_lemmas):
                     valid_files += 1
                 else:
                     cleaned_files += 1
@@ -56,7 +51,8 @@ def process_files(source_folder, corpus_file):
     print(f"Total: {valid_files + cleaned_files}")
 
 
-process_files("annotated corpora + dglib", "slovenian_corpus.txt")
+if __name__ == '__main__':
+    process_files("annotated corpora + dglib", "slovenian_corpus.txt", binary_prefix="slovenian_corpus")
 
 
 #Final corpus includes:
@@ -0,0 +1,32 @@
+import re
+
+
+allowed_tokens = {"person1", "proper1", "number1"}
+slovenian_chars = "abcčdefghijklmnoprsštuvzž"  # Slovenian alphabet only
+SLOVENIAN_WORD = re.compile(f"[{slovenian_chars}]*")
+
+# Verdict for every distinct lemma seen so far, so each is checked only once
+verdicts = {}
+
+
+def is_valid_lemma(lemma):
+    """Check if lemma is allowed token or Slovenian"""
+    verdict = verdicts.get(lemma)
+    if verdict is None:
+        # Must contain only slovenian letters
+        verdict = lemma in allowed_tokens or SLOVENIAN_WORD.fullmatch(lemma.lower()) is not None
+        verdicts[lemma] = verdict
+    return verdict
+
+
+def invalid_lemmas(lemmas):
+    """Get set of distinct invalid lemmas of a text"""
+    return {lemma for lemma in set(lemmas) if not is_valid_lemma(lemma)}
+
+
+def clean_lemmas(lemmas):
+    """Remove invalid lemmas, returns the same list if all are valid"""
+    invalid = invalid_lemmas(lemmas)
+    if not invalid:
+        return lemmas
+    return [lemma for lemma in lemmas if lemma not in invalid]
@@ -0,0 +1,272 @@
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+from query_engine import QueryEngine, load_embeddings
+
+
+def word_list(value, field):
+    """value if it is a list of words, else TypeError (a string would be read letter by letter)"""
+    if not isinstance(value, list) or not all(isinstance(word, str) for word in value):
+        raise TypeError(f"{field} must be a list of words")
+    return value
+
+
+def top_count(value, size):
+    """value if it is a whole number of neighbours in 1..size, else TypeError/ValueError"""
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError("topn must be a whole number")
+    if not 1 <= value <= size:
+        raise ValueError(f"topn must be between 1 and {size}")
+    return value
+
+
+def analogy_queries(value):
+    """List of {"positive": [...], "negative": [...]} with at least one word in every query"""
+    if not isinstance(value, list) or not all(isinstance(query, dict) for query in value):
+        raise TypeError("queries must be a list of objects")
+    for query in value:
+        words = word_list(query.get('positive', []), 'positive') + word_list(query.get('negative', []), 'negative')
+        if not words:
+            raise ValueError("every query needs at least one positive or negative word")
+    return value
+
+
+class LRUCache:
+    """Thread-safe cache of the last max_size results"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            if key in self.items:
+                self.items.move_to_end(key)
+                self.hits += 1
+                return self.items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            if len(self.items) > self.max_size:
+                self.items.popitem(last=False)
+
+
+class Batcher:
+    '''
+    Collects queries of concurrent requests for max_wait seconds (or max_batch
+    queries) and answers them with one analogy_batch call of the engine
+    '''
+
+    def __init__(self, engine, max_batch=256, max_wait=0.005):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.queries = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, positive, negative, topn):
+        """Future with list of (word, score)"""
+        future = Future()
+        self.queue.put((positive, negative, topn, future))
+        return future
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.time(), 0)))
+                except queue.Empty:
+                    break
+
+            topn = max(item[2] for item in batch)
+            try:
+                results = self.engine.analogy_batch([(item[0], item[1]) for item in batch], topn)
+            except Exception as e:
+                for item in batch:
+                    item[3].set_exception(e)
+                continue
+            self.batches += 1
+            self.queries += len(batch)
+            for item, result in zip(batch, results):
+                item[3].set_result(result[:item[2]])
+
+
+class EmbeddingService:
+    """Loaded stores, their batchers, cache and counters shared by all request threads"""
+
+    def __init__(self, stores, max_batch=256, max_wait=0.005, cache_size=10000):
+        '''
+        stores - dictionary name -> embedding file (.emb, .npy dictionary, word2vec text)
+        '''
+        self.vectors = {}
+        self.batchers = {}
+        for name, path in stores.items():
+            words, matrix = load_embeddings(path)  # .emb stays memory-mapped
+            engine = QueryEngine(words, matrix)
+            self.vectors[name] = (engine.index, matrix)
+            self.batchers[name] = Batcher(engine, max_batch, max_wait)
+        self.cache = LRUCache(cache_size)
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = {}
+        self.latencies = []
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.latencies.append(seconds)
+            del self.latencies[:-10000]  # Last 10000 requests
+
+    def vectors_of(self, store, words):
+        index, matrix = self.vectors[store]
+        return {word: np.asarray(matrix[index[word]], dtype=np.float64).tolist() if word in index else None
+                for word in words}
+
+    def most_similar(self, store, words, topn=10):
+        # Submit all words first, so they are answered in the same batches
+        futures = {word: self.pool_similar(store, [word], [], topn) for word in words}
+        return {word: future() for word, future in futures.items()}
+
+    def analogy(self, store, queries, topn=10):
+        futures = [self.pool_similar(store, list(q.get('positive', [])), list(q.get('negative', [])), topn)
+                   for q in queries]
+        return [future() for future in futures]
+
+    def pool_similar(self, store, positive, negative, topn):
+        """Callable returning the result; cached or unknown queries are not sent to the batcher"""
+        key = (store, tuple(positive), tuple(negative), topn)
+        result = self.cache.get(key)
+        if result is not None:
+            return lambda: result
+        index = self.vectors[store][0]
+        if not all(word in index for word in positive + negative):
+            return lambda: None
+        future = self.batchers[store].submit(positive, negative, topn)
+
+        def wait():
+            value = future.result()
+            self.cache.put(key, value)
+            return value
+        return wait
+
+    def stats(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+            requests = dict(self.requests)
+        uptime = time.time() - self.started
+        return {'uptime_seconds': uptime,
+                'requests': requests,
+                'requests_per_second': sum(requests.values()) / uptime,
+                'latency_ms': {'mean': float(latencies.mean()) if len(latencies) else None,
+                               'p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+                               'p99': float(np.percentile(latencies, 99)) if len(latencies) else None},
+                'cache': {'hits': self.cache.hits, 'misses': self.cache.misses, 'size': len(self.cache.items)},
+                'batches': {name: {'batches': b.batches, 'queries': b.queries,
+                                   'mean_batch': b.queries / b.batches if b.batches else None}
+                            for name, b in self.batchers.items()}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    '''
+    POST /vectors       {"store": "cbow", "words": ["noč"]}
+    POST /most_similar  {"store": "cbow", "words": ["noč", "vrata"], "topn": 10}
+    POST /analogy       {"store": "cbow", "queries": [{"positive": ["žena", "kralj"], "negative": ["moški"]}]}
+    GET  /stats
+    Unknown words give null; malformed requests (words not a list, query without words,
+    topn not in 1..number of words) give 400
+    '''
+    service = None
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            self.send_json(200, self.service.stats())
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        start = time.time()
+        endpoint = self.path.strip('/')
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not isinstance(request, dict):
+                raise TypeError("request must be a JSON object")
+            store = request.get('store') or next(iter(self.service.vectors))
+            if store not in self.service.vectors:
+                self.send_json(404, {'error': f'unknown store {store}'})
+                return
+            size = len(self.service.vectors[store][0])
+            if endpoint == 'vectors':
+                body = {'vectors': self.service.vectors_of(store, word_list(request['words'], 'words'))}
+            elif endpoint == 'most_similar':
+                body = {'results': self.service.most_similar(store, word_list(request['words'], 'words'),
+                                                             top_count(request.get('topn', 10), size))}
+            elif endpoint == 'analogy':
+                body = {'results': self.service.analogy(store, analogy_queries(request['queries']),
+                                                        top_count(request.get('topn', 10), size))}
+            else:
+                self.send_json(404, {'error': 'not found'})
+                return
+        except (KeyError, TypeError, ValueError) as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+            return
+        self.send_json(200, body)
+        self.service.record(endpoint, time.time() - start)
+
+    def log_message(self, format, *args):
+        pass  # No line per request
+
+
+class EmbeddingServer(ThreadingHTTPServer):
+    request_queue_size = 128  # Many clients connect at once
+    daemon_threads = True
+
+
+def make_server(stores, host='127.0.0.1', port=8765, **options):
+    """Server (not started) answering for the stores, port=0 - any free port"""
+    handler = type('StoreHandler', (Handler,), {'service': EmbeddingService(stores, **options)})
+    return EmbeddingServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local embedding lookup service")
+    parser.add_argument('stores', nargs='+', help="name=path, e.g. cbow=slv_cbow.emb")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait', type=float, default=0.005, help="seconds to wait for more queries")
+    parser.add_argument('--cache-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    server = make_server(dict(store.split('=', 1) for store in args.stores), args.host, args.port,
+                         max_batch=args.max_batch, max_wait=args.max_wait, cache_size=args.cache_size)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    server.serve_forever()
@@ -0,0 +1,145 @@
+import io
+import json
+import struct
+from collections.abc import Mapping
+import numpy as np
+
+# Store file: magic, header length (uint64) and JSON header, vocabulary (words
+# joined by '\n', UTF-8), offset index of the words (uint64, rows + 1 values)
+# and contiguous rows x dim matrix aligned to 64 bytes
+MAGIC = b'SLVEMB1\n'
+ALIGNMENT = 64
+
+
+def aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def save_store(path, words, matrix, dtype='float32'):
+    '''
+    words - list of words, in the order of the rows of matrix
+
+    matrix - words x dimension array of vectors
+
+    dtype - 'float32' or 'float16' (half the size, ~3 significant digits)
+    '''
+    matrix = np.asarray(matrix)
+    if matrix.ndim != 2 or matrix.shape[0] != len(words):
+        raise ValueError("matrix must have one row per word")
+
+    encoded = [word.encode('utf-8') for word in words]
+    vocab = b'\n'.join(encoded)
+    index = np.zeros(len(encoded) + 1, dtype='<u8')
+    np.cumsum([len(word) + 1 for word in encoded], out=index[1:])  # + 1 for '\n'
+
+    dtype = np.dtype(dtype).newbyteorder('<')
+    header = {'rows': len(words), 'dim': matrix.shape[1], 'dtype': dtype.str}
+    # Offsets depend on header length, so leave room for the numbers first
+    header.update(vocab_offset=0, index_offset=0, matrix_offset=0)
+    header_size = len(json.dumps(header)) + 64
+    start = len(MAGIC) + 8 + header_size
+    header['vocab_offset'] = start
+    header['index_offset'] = aligned(start + len(vocab))
+    header['matrix_offset'] = aligned(header['index_offset'] + index.nbytes)
+    header_bytes = json.dumps(header).encode('ascii').ljust(header_size)
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', header_size) + header_bytes)
+        f.write(vocab)
+        f.write(b'\0' * (header['index_offset'] - f.tell()))
+        f.write(index.tobytes())
+        f.write(b'\0' * (header['matrix_offset'] - f.tell()))
+        for start_row in range(0, len(words), 65536):  # No full copy of big matrices
+            f.write(np.ascontiguousarray(matrix[start_row:start_row + 65536], dtype=dtype).tobytes())
+
+
+class EmbeddingStore(Mapping):
+    """Read-only word -> vector mapping over a memory-mapped store file"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an embedding store")
+            header_size, = struct.unpack('<Q', f.read(8))
+            self.header = json.loads(f.read(header_size))
+
+        rows, dim = self.header['rows'], self.header['dim']
+        self.path = path
+        self.dim = dim
+        self.offsets = np.memmap(path, dtype='<u8', mode='r', offset=self.header['index_offset'], shape=(rows + 1,))
+        if rows:
+            self.matrix = np.memmap(path, dtype=self.header['dtype'], mode='r',
+                                    offset=self.header['matrix_offset'], shape=(rows, dim))
+        else:
+            self.matrix = np.zeros((0, dim), dtype=self.header['dtype'])
+        self._words = None
+        self._index = None
+
+    def word(self, row):
+        """Word of one row, without decoding the whole vocabulary"""
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1]) - 1
+        with open(self.path, 'rb') as f:
+            f.seek(self.header['vocab_offset'] + start)
+            return f.read(end - start).decode('utf-8')
+
+    @property
+    def words(self):
+        if self._words is None:
+            with open(self.path, 'rb') as f:
+                f.seek(self.header['vocab_offset'])
+                vocab = f.read(max(int(self.offsets[-1]) - 1, 0)).decode('utf-8')
+            self._words = vocab.split('\n') if len(self) else []
+        return self._words
+
+    @property
+    def index(self):
+        """Dictionary word -> row, built on first lookup"""
+        if self._index is None:
+            self._index = {word: row for row, word in enumerate(self.words)}
+        return self._index
+
+    def __getitem__(self, word):
+        return self.matrix[self.index[word]]
+
+    def __contains__(self, word):
+        return word in self.index
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return self.header['rows']
+
+    def vectors(self, words):
+        """Matrix of vectors of several words (KeyError for unknown ones)"""
+        return np.asarray(self.matrix[[self.index[word] for word in words]])
+
+
+def load_store(path):
+    return EmbeddingStore(path)
+
+
+def convert_npy_dict(npy_path, store_path, dtype='float32'):
+    """Convert dictionary saved with np.save (create_dictionary, slv_cbow_dictionary.npy)"""
+    dictionary = np.load(npy_path, allow_pickle=True).item()
+    words = list(dictionary)
+    save_store(store_path, words, np.stack([dictionary[word] for word in words]), dtype)
+
+
+def read_word2vec_text(path):
+    """Words and float32 matrix of a text dictionary written by save_dictionary (word2vec text format)"""
+    with io.open(path, 'r', encoding='utf-8', newline='\n', errors='ignore') as fin:
+        length, dimension = map(int, fin.readline().split())
+        words = []
+        matrix = np.empty((length, dimension), dtype=np.float32)
+        for row, line in enumerate(fin):
+            tokens = line.rstrip().split(' ')
+            words.append(tokens[0])
+            matrix[row] = np.array(tokens[1:], dtype=np.float32)
+    return words, matrix[:len(words)]
+
+
+def convert_word2vec_text(txt_path, store_path, dtype='float32'):
+    """Convert text dictionary written by save_dictionary (word2vec text format)"""
+    words, matrix = read_word2vec_text(txt_path)
+    save_store(store_path, words, matrix, dtype)
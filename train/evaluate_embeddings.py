@@ -0,0 +1,177 @@
+import os
+import csv
+import gc
+import time
+import tracemalloc
+import numpy as np
+from scipy.stats import spearmanr
+
+from query_engine import QueryEngine
+
+# Analogies "a b c d" (a is to b as c is to d), sections start with ':'
+GENDER_ANALOGIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'analogies_gender_sl.txt')
+
+
+def read_analogies(path):
+    """List of (section, a, b, c, d) from file in the word2vec questions-words format"""
+    questions = []
+    section = ''
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(':'):
+                section = line[1:].strip()
+            elif line.strip():
+                questions.append((section, *line.lower().split()[:4]))
+    return questions
+
+
+def read_similarities(path):
+    """List of (word1, word2, score) from TSV file, a header line is skipped"""
+    pairs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.reader(f, delimiter='\t'):
+            if len(row) < 3 or row[0].startswith('#'):
+                continue
+            try:
+                pairs.append((row[0].lower(), row[1].lower(), float(row[2])))
+            except ValueError:
+                continue  # Header
+    return pairs
+
+
+def evaluate_analogies(engine, questions, batch_size=10000):
+    '''
+    Accuracy of the top answer of 3CosAdd (same as gensim evaluate_word_analogies),
+    questions with unknown words are not counted but reported as coverage
+    '''
+    known = [q for q in questions if all(word in engine.index for word in q[1:])]
+    start = time.time()
+    correct = 0
+    for first in range(0, len(known), batch_size):
+        batch = known[first:first + batch_size]
+        answers = engine.analogy_batch([([b, c], [a]) for _, a, b, c, _ in batch], topn=1)
+        correct += sum(bool(answer) and answer[0][0] == q[4] for q, answer in zip(batch, answers))
+    seconds = time.time() - start
+    return {'accuracy': correct / len(known) if known else float('nan'),
+            'coverage': len(known) / len(questions) if questions else float('nan'),
+            'queries': len(known),
+            'queries_per_second': len(known) / seconds if seconds > 0 else float('nan')}
+
+
+def evaluate_similarities(engine, pairs):
+    """Spearman correlation of cosine similarities with the scores of the pairs"""
+    known = [p for p in pairs if p[0] in engine.index and p[1] in engine.index]
+    start = time.time()
+    if known:
+        first = engine.matrix[[engine.index[p[0]] for p in known]]
+        second = engine.matrix[[engine.index[p[1]] for p in known]]
+        cosines = np.einsum('ij,ij->i', first, second)
+    seconds = time.time() - start
+    rho = spearmanr(cosines, [p[2] for p in known])[0] if len(known) > 1 else float('nan')
+    return {'spearman': float(rho),
+            'coverage': len(known) / len(pairs) if pairs else float('nan'),
+            'queries': len(known),
+            'queries_per_second': len(known) / seconds if seconds > 0 else float('nan')}
+
+
+def load_engine(model):
+    """QueryEngine from a path (.emb, .npy dictionary, word2vec text), gensim model.wv or engine"""
+    if isinstance(model, QueryEngine):
+        return model
+    if isinstance(model, str):
+        return QueryEngine.load(model)
+    return QueryEngine.from_keyed_vectors(model)
+
+
+def rss_mb(field):
+    """VmRSS (current) or VmHWM (peak) resident memory of the process in MB, None outside Linux"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024  # kB
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Set the peak resident memory (VmHWM) to the current one, False if not possible (Linux 4.0+ only)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return rss_mb('VmHWM') is not None
+    except OSError:
+        return False
+
+
+class ModelMemory:
+    '''
+    Memory of one model (load and evaluation): peak resident memory above the
+    resident memory before it, so every model gets its own footprint. Without
+    the peak reset the peak of traced allocations (tracemalloc) is used, which
+    does not count memory-mapped matrices.
+    '''
+
+    def __enter__(self):
+        gc.collect()
+        self.tracing = not reset_peak_rss()
+        if self.tracing:
+            tracemalloc.start()
+        else:
+            self.before = rss_mb('VmRSS')
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.tracing:
+            self.mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+        else:
+            self.mb = rss_mb('VmHWM') - self.before
+
+
+def evaluate_models(models, analogy_files=(GENDER_ANALOGIES,), similarity_files=(), output_file=None):
+    '''
+    models - dictionary name -> path, gensim model.wv or QueryEngine
+    (e.g. {'cbow_min10': model10.wv, 'svd_1024': 'slovenian_lit_SVD_1024.emb'})
+
+    analogy_files - files in the questions-words format
+
+    similarity_files - TSV files word1, word2, human score
+
+    Returns list of rows (one per model and test file), also written to output_file as TSV;
+    memory_mb - memory of loading and evaluating the model (see ModelMemory)
+    '''
+    rows = []
+    for name, model in models.items():
+        model_rows = []
+        with ModelMemory() as memory:
+            start = time.time()
+            engine = load_engine(model)
+            load_seconds = time.time() - start
+            common = {'model': name, 'words': len(engine.words), 'dimension': engine.matrix.shape[1],
+                      'matrix_mb': engine.matrix.nbytes / 2 ** 20, 'load_seconds': load_seconds}
+
+            for path in analogy_files:
+                result = evaluate_analogies(engine, read_analogies(path))
+                model_rows.append({**common, 'test': os.path.basename(path), 'metric': 'accuracy',
+                                   'score': result['accuracy'], 'coverage': result['coverage'],
+                                   'queries': result['queries'], 'queries_per_second': result['queries_per_second']})
+            for path in similarity_files:
+                result = evaluate_similarities(engine, read_similarities(path))
+                model_rows.append({**common, 'test': os.path.basename(path), 'metric': 'spearman',
+                                   'score': result['spearman'], 'coverage': result['coverage'],
+                                   'queries': result['queries'], 'queries_per_second': result['queries_per_second']})
+            del engine
+        rows += [{**row, 'memory_mb': memory.mb} for row in model_rows]
+
+    for row in rows:
+        print(f"{row['model']:<20} {row['test']:<28} {row['metric']} {row['score']:.4f} "
+              f"(coverage {row['coverage']:.2%}, {row['queries_per_second']:,.0f} queries/s)")
+
+    if output_file and rows:
+        with open(output_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]), delimiter='\t')
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
@@ -0,0 +1,132 @@
+import os
+import time
+from multiprocessing import Pool
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+from query_engine import top_k
+
+# Graph <prefix>: rows x k neighbour rows (int32) and their cosine similarities (float16),
+# both .npy files, so np.load(..., mmap_mode='r') opens them without reading
+INDICES_SUFFIX = '.knn_indices.npy'
+SCORES_SUFFIX = '.knn_scores.npy'
+
+# Bytes per query x vocabulary score while a block is ranked: float32 scores, their
+# negated copy and the int64 argpartition result of top_k
+SCORE_BYTES = 16
+
+# Matrix, inverse row lengths and outputs of the current worker process
+matrix = None
+inverse_lengths = None
+indices_out = None
+scores_out = None
+
+
+def row_lengths(matrix, block_size=65536):
+    return np.concatenate([np.linalg.norm(np.asarray(matrix[start:start + block_size], dtype=np.float32), axis=1)
+                           for start in range(0, len(matrix), block_size)])
+
+
+def init_worker(matrix_path, lengths, output_prefix, threads):
+    global matrix, inverse_lengths, indices_out, scores_out
+    threadpool_limits(limits=threads)
+    matrix = np.load(matrix_path, mmap_mode='r')
+    inverse_lengths = None if lengths is None else 1 / np.where(lengths > 0, lengths, 1).astype(np.float32)
+    indices_out = np.load(output_prefix + INDICES_SUFFIX, mmap_mode='r+')
+    scores_out = np.load(output_prefix + SCORES_SUFFIX, mmap_mode='r+')
+
+
+def rows_block(start, end):
+    block = np.asarray(matrix[start:end], dtype=np.float32)
+    if inverse_lengths is not None:
+        block = block * inverse_lengths[start:end, None]
+    return block
+
+
+def vocab_block_size(query_block, dimension, k, memory_mb):
+    """Vocabulary rows per block, so one worker uses about memory_mb for a block"""
+    budget = memory_mb * 2 ** 20 - query_block * dimension * 4
+    return max(k + 1, int(budget // (query_block * SCORE_BYTES + dimension * 4)))
+
+
+def knn_rows(task):
+    '''
+    Exact top k neighbours of rows start:end (the row itself is skipped),
+    compared with vocab_block rows of the matrix at a time
+    '''
+    start, end, k, vocab_block = task
+    queries = rows_block(start, end)
+    block_indices, block_scores = [], []
+    for vocab_start in range(0, len(matrix), vocab_block):
+        scores = queries @ rows_block(vocab_start, vocab_start + vocab_block).T
+        # The word itself is not its own neighbour
+        own = np.arange(max(start, vocab_start), min(end, vocab_start + vocab_block))
+        scores[own - start, own - vocab_start] = -np.inf
+        found, values = top_k(scores, k)
+        block_indices.append(found + vocab_start)
+        block_scores.append(values)
+        # Keep only the best k candidates, memory stays queries x (k + vocab_block)
+        candidates, candidate_scores = np.hstack(block_indices), np.hstack(block_scores)
+        found, values = top_k(candidate_scores, k)
+        block_indices = [np.take_along_axis(candidates, found, axis=1)]
+        block_scores = [values]
+
+    indices_out[start:end] = block_indices[0]
+    scores_out[start:end] = block_scores[0]
+    indices_out.flush()
+    scores_out.flush()
+    return end - start
+
+
+def build_knn_graph(matrix_path, output_prefix, k=100, workers=None, normalized=True,
+                    query_block=1024, vocab_block=None, worker_memory_mb=256, threads=1):
+    '''
+    matrix_path - .npy matrix of word vectors (slv_cbow_norm_embeddings.npy or sigma_vt),
+    rows in the order of the words
+
+    normalized - False if the rows are not of unit length (they are scaled on the fly)
+
+    query_block, vocab_block - rows multiplied at once; ranking a block takes about
+    query_block x vocab_block x 16 bytes (scores, their negated copy, int64 argpartition),
+    e.g. 1 GB for 1024 x 65536
+
+    worker_memory_mb - memory of one worker for a block, vocab_block is derived from it
+    if not given; all workers together (default one per core) use workers x worker_memory_mb
+
+    threads - BLAS threads of every worker process
+    '''
+    vectors = np.load(matrix_path, mmap_mode='r')
+    rows = len(vectors)
+    k = min(k, rows - 1)
+    vocab_block = vocab_block or vocab_block_size(query_block, vectors.shape[1], k, worker_memory_mb)
+    lengths = None if normalized else row_lengths(vectors)
+
+    indices = np.lib.format.open_memmap(output_prefix + INDICES_SUFFIX, mode='w+', dtype=np.int32, shape=(rows, k))
+    scores = np.lib.format.open_memmap(output_prefix + SCORES_SUFFIX, mode='w+', dtype=np.float16, shape=(rows, k))
+    del indices, scores  # Workers write into the files
+
+    tasks = [(start, min(start + query_block, rows), k, vocab_block) for start in range(0, rows, query_block)]
+    start_time = time.time()
+    done = 0
+    with Pool(workers or os.cpu_count(), initializer=init_worker,
+              initargs=(matrix_path, lengths, output_prefix, threads)) as pool:
+        for count in pool.imap_unordered(knn_rows, tasks):
+            done += count
+    print(f"{done:,} rows, k={k} (blocks {query_block} x {vocab_block}): {time.time() - start_time:.1f} s")
+
+
+def load_knn_graph(output_prefix):
+    """Memory-mapped (indices, scores)"""
+    return (np.load(output_prefix + INDICES_SUFFIX, mmap_mode='r'),
+            np.load(output_prefix + SCORES_SUFFIX, mmap_mode='r'))
+
+
+def neighbours(graph, words, word_index, word, topn=10):
+    """Same list as most_similar(word, topn), read from the graph"""
+    indices, scores = graph
+    row = word_index[word]
+    return [(words[i], float(s)) for i, s in zip(indices[row, :topn].tolist(), scores[row, :topn].tolist())]
+
+
+if __name__ == '__main__':
+    build_knn_graph('slv_cbow_norm_embeddings.npy', 'slv_cbow', k=100)
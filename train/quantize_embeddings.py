@@ -0,0 +1,204 @@
+import time
+import numpy as np
+
+from query_engine import QueryEngine, load_embeddings, normalize, top_k
+
+
+def kmeans(data, k, n_iter=20, random_state=0, block_size=65536):
+    """Euclidean k-means (Lloyd), returns centroids"""
+    rng = np.random.default_rng(random_state)
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = nearest_centroids(data, centroids, block_size)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+        counts = np.bincount(assignment, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]  # Empty clusters keep the old centroid
+    return centroids
+
+
+def nearest_centroids(data, centroids, block_size=65536):
+    squared = (centroids ** 2).sum(axis=1)
+    return np.concatenate([np.argmin(squared - 2 * data[start:start + block_size] @ centroids.T, axis=1)
+                           for start in range(0, len(data), block_size)]).astype(np.int64)
+
+
+def blocked_top_k(blocks, k):
+    """Top k of (first row, scores) blocks of columns, only k candidates of each block are kept"""
+    block_indices, block_scores = [], []
+    for start, scores in blocks:
+        found, values = top_k(scores, k)
+        block_indices.append(found + start)
+        block_scores.append(values)
+    indices, scores = np.hstack(block_indices), np.hstack(block_scores)
+    found, scores = top_k(scores, k)
+    return np.take_along_axis(indices, found, axis=1), scores
+
+
+class Int8Index:
+    '''
+    Scalar quantization: every normalized row is stored as int8 codes and one
+    float32 scale (row ~ codes * scale), 4x smaller than float32
+    '''
+
+    def __init__(self, codes, scales):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """matrix - normalized rows"""
+        scales = np.abs(matrix).max(axis=1) / 127
+        scales[scales == 0] = 1
+        codes = np.round(matrix / scales[:, None]).astype(np.int8)
+        return cls(codes, scales.astype(np.float32))
+
+    def search(self, queries, k, block_size=65536):
+        """Top k rows and approximate cosine similarities, computed from the codes"""
+        queries = normalize(np.atleast_2d(queries))
+        return blocked_top_k(((start, (queries @ self.codes[start:start + block_size].T.astype(np.float32))
+                                       * self.scales[start:start + block_size])
+                               for start in range(0, len(self.codes), block_size)), k)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.scales.nbytes
+
+    def save(self, prefix):
+        np.save(prefix + '.int8_codes.npy', self.codes)
+        np.save(prefix + '.int8_scales.npy', self.scales)
+
+    @classmethod
+    def load(cls, prefix):
+        return cls(np.load(prefix + '.int8_codes.npy', mmap_mode='r'), np.load(prefix + '.int8_scales.npy'))
+
+
+class PQIndex:
+    '''
+    Product quantization: normalized rows are split into m subvectors and every
+    subvector is replaced by the byte id of the nearest of 256 centroids
+    (m bytes per row). Scores are sums of query x centroid tables (ADC).
+    '''
+
+    def __init__(self, centroids, codes):
+        '''
+        centroids - m x 256 x subvector dimension
+
+        codes - rows x m uint8
+        '''
+        self.centroids = centroids
+        self.codes = codes
+
+    @classmethod
+    def from_matrix(cls, matrix, m=None, n_iter=20, sample_size=100_000, random_state=0):
+        '''
+        matrix - normalized rows
+
+        m - number of subvectors, default dimension / 4; the dimension is padded
+        with zeros to a multiple of m
+        '''
+        m = m or max(1, matrix.shape[1] // 4)
+        matrix = pad(matrix, m)
+        rng = np.random.default_rng(random_state)
+        sample = matrix[rng.choice(len(matrix), min(sample_size, len(matrix)), replace=False)]
+        n_centroids = min(256, len(sample))
+        sub = matrix.shape[1] // m
+
+        centroids = np.zeros((m, 256, sub), dtype=np.float32)
+        codes = np.empty((len(matrix), m), dtype=np.uint8)
+        for j in range(m):
+            part = slice(j * sub, (j + 1) * sub)
+            centroids[j, :n_centroids] = kmeans(sample[:, part], n_centroids, n_iter, random_state + j)
+            codes[:, j] = nearest_centroids(matrix[:, part], centroids[j, :n_centroids])
+        return cls(centroids, codes)
+
+    def search(self, queries, k, block_size=65536):
+        """Top k rows and approximate cosine similarities, computed from the codes"""
+        queries = pad(normalize(np.atleast_2d(queries)), len(self.centroids))
+        m, _, sub = self.centroids.shape
+        # Tables: queries x m x 256 dot products of query subvectors with centroids
+        tables = np.einsum('qms,mcs->qmc', queries.reshape(len(queries), m, sub), self.centroids)
+
+        def blocks():
+            for start in range(0, len(self.codes), block_size):
+                codes = self.codes[start:start + block_size].astype(np.int64)
+                scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+                for j in range(m):
+                    scores += tables[:, j, codes[:, j]]
+                yield start, scores
+
+        return blocked_top_k(blocks(), k)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.centroids.nbytes
+
+    def save(self, prefix):
+        np.save(prefix + '.pq_codes.npy', self.codes)
+        np.save(prefix + '.pq_centroids.npy', self.centroids)
+
+    @classmethod
+    def load(cls, prefix):
+        return cls(np.load(prefix + '.pq_centroids.npy'), np.load(prefix + '.pq_codes.npy', mmap_mode='r'))
+
+
+def pad(matrix, m):
+    """Zero columns up to a multiple of m (do not change dot products)"""
+    extra = -matrix.shape[1] % m
+    if extra:
+        matrix = np.hstack([matrix, np.zeros((len(matrix), extra), dtype=matrix.dtype)])
+    return matrix
+
+
+def recall_at_k(index, matrix, k=10, n_queries=1000, random_state=0):
+    """Mean share of the exact top k neighbours (full precision) found by the index, query words excluded"""
+    rng = np.random.default_rng(random_state)
+    rows = rng.choice(len(matrix), min(n_queries, len(matrix)), replace=False)
+    queries = matrix[rows]
+    exact = QueryEngine(range(len(matrix)), matrix).search(queries, k, [{row} for row in rows])[0]
+    start = time.time()
+    # One more, as the query row itself is (usually) among the found ones
+    approximate = index.search(queries, k + 1)[0]
+    seconds = time.time() - start
+    approximate = [[found for found in row_list if found != row][:k] for row, row_list in zip(rows, approximate.tolist())]
+    recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(exact.tolist(), approximate)])
+    return float(recall), len(queries) / seconds
+
+
+def export_quantized(path, prefix, kind='int8', k=10, **options):
+    '''
+    Write int8 ('int8') or product quantized ('pq', options m, n_iter) version
+    of any embedding file (.emb, .npy dictionary, word2vec text) to prefix,
+    with the words in prefix.words.txt (one per line, in the order of the codes)
+
+    Returns report with memory of the matrix and recall@k against full precision
+    '''
+    words, vectors = load_embeddings(path)
+    original_bytes = np.asarray(vectors).nbytes
+    matrix = normalize(vectors)
+    if kind == 'int8':
+        index = Int8Index.from_matrix(matrix, **options)
+    elif kind == 'pq':
+        index = PQIndex.from_matrix(matrix, **options)
+    else:
+        raise ValueError(f"Unknown quantization: {kind}")
+
+    index.save(prefix)
+    with open(prefix + '.words.txt', 'w', encoding='utf-8') as f:
+        f.writelines(word + '\n' for word in words)
+
+    recall, queries_per_second = recall_at_k(index, matrix, k)
+    report = {'kind': kind, 'original_mb': original_bytes / 2 ** 20, 'float32_mb': matrix.nbytes / 2 ** 20,
+              'quantized_mb': index.nbytes / 2 ** 20, 'saved': 1 - index.nbytes / matrix.nbytes,
+              f'recall@{k}': recall, 'queries_per_second': queries_per_second}
+    print(f"{kind}: {report['quantized_mb']:.1f} MB instead of {report['float32_mb']:.1f} MB (float32), "
+          f"recall@{k} {recall:.3f}")
+    return report
+
+
+def load_quantized(prefix, kind='int8'):
+    """Words and the index written by export_quantized"""
+    with open(prefix + '.words.txt', 'r', encoding='utf-8') as f:
+        words = f.read().split('\n')[:-1]
+    return words, (Int8Index if kind == 'int8' else PQIndex).load(prefix)
@@ -0,0 +1,205 @@
+import numpy as np
+
+from embedding_store import EmbeddingStore, read_word2vec_text
+
+
+def load_embeddings(path):
+    '''
+    Words and vectors of any of our embedding files:
+    .emb (embedding_store), .npy dictionary (create_dictionary, slv_cbow_dictionary.npy)
+    or word2vec text format (save_dictionary)
+    '''
+    if path.endswith('.emb'):
+        store = EmbeddingStore(path)
+        return store.words, store.matrix
+    if path.endswith('.npy'):
+        dictionary = np.load(path, allow_pickle=True).item()
+        words = list(dictionary)
+        return words, np.stack([dictionary[word] for word in words])
+
+    return read_word2vec_text(path)
+
+
+def normalize(matrix, dtype=np.float32):
+    """Rows of unit length (zero rows stay zero), as normalized_embeddings in word2vec_cbow"""
+    matrix = np.array(matrix, dtype=dtype)
+    lengths = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(lengths > 0, lengths, 1)
+    return matrix
+
+
+def top_k(scores, k):
+    """Indices and values of the k largest scores of every row, in descending order"""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        return np.zeros((scores.shape[0], 0), dtype=np.int64), np.zeros((scores.shape[0], 0), dtype=scores.dtype)
+    if k < scores.shape[1]:
+        candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    values = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(-values, axis=1, kind='stable')
+    return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(values, order, axis=1)
+
+
+def spherical_kmeans(matrix, n_lists, n_iter=10, sample_size=100_000, random_state=0, block_size=65536):
+    """Centroids (unit length) of k-means with cosine similarity, trained on a sample of rows"""
+    rng = np.random.default_rng(random_state)
+    sample = matrix[rng.choice(len(matrix), min(sample_size, len(matrix)), replace=False)]
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = np.concatenate([np.argmax(sample[start:start + block_size] @ centroids.T, axis=1)
+                                     for start in range(0, len(sample), block_size)])
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]  # Keep the old centroid of an empty list
+        centroids = normalize(sums, matrix.dtype)
+    return centroids
+
+
+class IVFIndex:
+    '''
+    Inverted file index: rows are grouped by the nearest centroid and a query
+    is compared only with the rows of its n_probe nearest lists
+    '''
+
+    def __init__(self, matrix, n_lists=None, n_iter=10, random_state=0, block_size=65536):
+        '''
+        matrix - normalized rows (from normalize)
+
+        n_lists - number of lists, default ~4 * sqrt(rows)
+        '''
+        if n_lists is None:
+            n_lists = max(1, int(4 * np.sqrt(len(matrix))))
+        n_lists = min(n_lists, len(matrix))
+        self.centroids = spherical_kmeans(matrix, n_lists, n_iter, random_state=random_state)
+        assignment = np.concatenate([np.argmax(matrix[start:start + block_size] @ self.centroids.T, axis=1)
+                                     for start in range(0, len(matrix), block_size)])
+        # Rows of list i are rows[offsets[i]:offsets[i + 1]], their vectors are contiguous
+        self.rows = np.argsort(assignment, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=n_lists))])
+        self.vectors = matrix[self.rows]
+
+    def search(self, queries, k, n_probe=8):
+        """Approximate top k rows and scores for every query (rows -1 if fewer candidates)"""
+        n_probe = min(n_probe, len(self.centroids))
+        lists, _ = top_k(queries @ self.centroids.T, n_probe)
+        indices = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=queries.dtype)
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([np.arange(self.offsets[j], self.offsets[j + 1]) for j in lists[i]])
+            found, values = top_k((self.vectors[candidates] @ query)[None, :], k)
+            indices[i, :found.shape[1]] = self.rows[candidates[found[0]]]
+            scores[i, :found.shape[1]] = values[0]
+        return indices, scores
+
+
+class QueryEngine:
+    """most_similar and analogy queries over any embedding set, the matrix is normalized once"""
+
+    def __init__(self, words, matrix, block_size=65536, dtype=np.float32):
+        '''
+        words - list of words, in the order of the rows of matrix
+
+        block_size - rows of the vocabulary multiplied at once, bounds
+        the memory of the scores to queries x block_size
+        '''
+        self.words = list(words)
+        self.index = {word: row for row, word in enumerate(self.words)}
+        self.matrix = normalize(matrix, dtype)
+        self.block_size = block_size
+        self.ivf = None
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        return cls(*load_embeddings(path), **kwargs)
+
+    @classmethod
+    def from_keyed_vectors(cls, wv, **kwargs):
+        """From gensim model.wv"""
+        return cls(wv.index_to_key, wv.vectors, **kwargs)
+
+    def build_ivf(self, n_lists=None, n_iter=10, random_state=0):
+        """Build approximate index, used by search(..., approximate=True)"""
+        self.ivf = IVFIndex(self.matrix, n_lists, n_iter, random_state, self.block_size)
+        return self.ivf
+
+    def search(self, queries, k, exclude=None, approximate=False, n_probe=8):
+        '''
+        Top k rows by cosine similarity for a batch of query vectors
+
+        exclude - list of sets of rows to skip for every query (e.g. the query words)
+
+        approximate - use the IVF index (build_ivf) instead of the exact search
+
+        Returns rows and scores, queries x k (rows -1 if there are fewer words)
+        '''
+        queries = normalize(np.atleast_2d(queries), self.matrix.dtype)
+        if exclude is None:
+            exclude = [()] * len(queries)
+        extra = max((len(rows) for rows in exclude), default=0)
+        wanted = k + extra
+
+        if approximate:
+            if self.ivf is None:
+                raise ValueError("Build the index first (build_ivf)")
+            indices, scores = self.ivf.search(queries, wanted, n_probe)
+        else:
+            # Top candidates of every block, merged at the end
+            block_indices, block_scores = [], []
+            for start in range(0, len(self.matrix), self.block_size):
+                found, values = top_k(queries @ self.matrix[start:start + self.block_size].T, wanted)
+                block_indices.append(found + start)
+                block_scores.append(values)
+            if block_indices:
+                indices, scores = np.hstack(block_indices), np.hstack(block_scores)
+                found, scores = top_k(scores, wanted)
+                indices = np.take_along_axis(indices, found, axis=1)
+            else:
+                indices = np.zeros((len(queries), 0), dtype=np.int64)
+                scores = np.zeros((len(queries), 0), dtype=queries.dtype)
+
+        rows = np.full((len(queries), k), -1, dtype=np.int64)
+        result = np.full((len(queries), k), -np.inf, dtype=queries.dtype)
+        for i, skip in enumerate(exclude):
+            keep = [j for j, row in enumerate(indices[i]) if row >= 0 and row not in skip][:k]
+            rows[i, :len(keep)] = indices[i, keep]
+            result[i, :len(keep)] = scores[i, keep]
+        return rows, result
+
+    def _results(self, rows, scores):
+        return [[(self.words[row], float(score)) for row, score in zip(row_list, score_list) if row >= 0]
+                for row_list, score_list in zip(rows.tolist(), scores.tolist())]
+
+    def most_similar_batch(self, words, topn=10, **search_options):
+        """most_similar for many words with one matrix product per block"""
+        rows = [self.index[word] for word in words]
+        found, scores = self.search(self.matrix[rows], topn, [{row} for row in rows], **search_options)
+        return self._results(found, scores)
+
+    def analogy_batch(self, queries, topn=10, **search_options):
+        '''
+        queries - list of (positive, negative) lists of words, e.g.
+        [(["žena", "kralj"], ["moški"])]
+
+        Same 3CosAdd as gensim most_similar(positive=..., negative=...):
+        mean of normalized vectors with weights 1 and -1, input words are skipped
+        '''
+        vectors = np.empty((len(queries), self.matrix.shape[1]), dtype=self.matrix.dtype)
+        exclude = []
+        for i, (positive, negative) in enumerate(queries):
+            rows = [self.index[word] for word in positive] + [self.index[word] for word in negative]
+            if not rows:
+                raise ValueError("cannot compute similarity with no input")  # As gensim
+            weights = np.array([1.0] * len(positive) + [-1.0] * len(negative), dtype=self.matrix.dtype)
+            vectors[i] = weights @ self.matrix[rows] / len(rows)
+            exclude.append(set(rows))
+        found, scores = self.search(vectors, topn, exclude, **search_options)
+        return self._results(found, scores)
+
+    def most_similar(self, positive=(), negative=(), topn=10, **search_options):
+        """Same call as model.wv.most_similar: one word or positive/negative lists"""
+        if isinstance(positive, str):
+            positive = [positive]
+        return self.analogy_batch([(list(positive), list(negative))], topn, **search_options)[0]
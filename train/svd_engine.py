@@ -0,0 +1,127 @@
+import time
+import numpy as np
+from scipy.sparse.linalg import svds
+from sklearn.utils.extmath import randomized_svd
+from threadpoolctl import threadpool_limits
+
+
+def orthonormalize(a):
+    return np.linalg.qr(a)[0]
+
+
+def block_krylov_svd(W, k, n_iter=3, n_oversamples=10, random_state=0, chunk_size=256):
+    '''
+    Randomized block Krylov SVD: the top k triplets from the subspace
+    [W X, (W W^T) W X, ..., (W W^T)^n_iter W X] for a random block X
+
+    The small problem K^T W W^T K is built in chunks of chunk_size columns,
+    so no dense matrix of the size of W is made.
+    '''
+    n, m = W.shape
+    rng = np.random.default_rng(random_state)
+    block = orthonormalize(W @ rng.standard_normal((m, k + n_oversamples)).astype(W.dtype))
+    blocks = [block]
+    for _ in range(n_iter):
+        block = orthonormalize(W @ orthonormalize(W.T @ block))
+        blocks.append(block)
+    K = orthonormalize(np.hstack(blocks))  # At most n columns
+
+    T = np.empty((K.shape[1], K.shape[1]), dtype=W.dtype)
+    for start in range(0, K.shape[1], chunk_size):
+        T[:, start:start + chunk_size] = K.T @ (W @ (W.T @ K[:, start:start + chunk_size]))
+    eigenvalues, eigenvectors = np.linalg.eigh(T)
+
+    top = np.argsort(eigenvalues)[::-1][:k]
+    sigma = np.sqrt(np.clip(eigenvalues[top], 0, None))
+    u = K @ eigenvectors[:, top]
+    vt = (W.T @ u).T / np.where(sigma > 0, sigma, 1)[:, None]
+    return u, sigma, vt
+
+
+def truncated_svd(W, k, solver='arpack', dtype=np.float64, threads=None, **options):
+    '''
+    W - matrix texts x words
+
+    k - the rank of the SVD, must be less than any dimension of W
+
+    solver - 'arpack' (scipy svds, as before, used for the saved embeddings),
+    'randomized' (scikit-learn randomized SVD with power iterations, faster, less
+    accurate unless n_iter is raised) or 'krylov' (block Krylov)
+
+    dtype - np.float64 as before, np.float32 halves memory
+
+    threads - number of BLAS threads, None - all cores
+
+    Returns u, sigma, vt with singular values in descending order
+    '''
+    W = W.astype(dtype)
+    with threadpool_limits(limits=threads):
+        if solver == 'randomized':
+            u, sigma, vt = randomized_svd(W, k, random_state=options.pop('random_state', 0), **options)
+        elif solver == 'krylov':
+            u, sigma, vt = block_krylov_svd(W, k, **options)
+        elif solver == 'arpack':
+            u, sigma, vt = svds(W, k, **options)
+        else:
+            raise ValueError(f"Unknown solver: {solver}")
+
+    # The order of the singular values is descending
+    order = np.argsort(sigma)[::-1]
+    return u[:, order], sigma[order], vt[order]
+
+
+def reconstruction_errors(W, u, sigma, vt):
+    '''
+    Relative Frobenius error ||W - u_k sigma_k vt_k|| / ||W|| for every prefix k
+
+    Uses ||W - U S V^T||^2 = ||W||^2 - 2 sum(s_i u_i^T W v_i) + sum(s_i^2),
+    so the low-rank matrix is never built.
+    '''
+    norm2 = float(W.multiply(W).sum()) if hasattr(W, 'multiply') else float((W ** 2).sum())
+    projections = np.einsum('ij,ij->j', u, W @ vt.T)
+    error2 = norm2 - 2 * np.cumsum(sigma * projections) + np.cumsum(sigma ** 2)
+    return np.sqrt(np.clip(error2, 0, None) / norm2)
+
+
+def sigma_vt(sigma, vt):
+    """Word vectors, same as np.dot(np.diag(sigma), vt).T"""
+    return vt.T * sigma
+
+
+def svd_ranks(W, ranks, solver='arpack', dtype=np.float64, threads=None, **options):
+    '''
+    Compute SVD of the largest rank once and slice it for every rank
+
+    Returns dictionary k -> (u, sigma, vt) and report with time and
+    reconstruction error of every rank
+    '''
+    start = time.time()
+    u, sigma, vt = truncated_svd(W, max(ranks), solver, dtype, threads, **options)
+    seconds = time.time() - start
+    errors = reconstruction_errors(W.astype(dtype), u, sigma, vt)
+
+    svd = {k: (u[:, :k], sigma[:k], vt[:k]) for k in ranks}
+    report = [{'solver': solver, 'k': k, 'seconds': seconds, 'relative_error': float(errors[k - 1])}
+              for k in ranks]
+    return svd, report
+
+
+def compare_solvers(W, k, solvers=('arpack', 'randomized', 'krylov'), dtype=np.float64, threads=None):
+    """Time and reconstruction error of rank k SVD for each solver (float64 as the saved embeddings, float32 opt-in)"""
+    report = []
+    for solver in solvers:
+        report += svd_ranks(W, [k], solver, dtype, threads)[1]
+        print(f"{solver}: {report[-1]['seconds']:.1f} s, relative error {report[-1]['relative_error']:.4f}")
+    return report
+
+
+def save_svd(u, sigma, vt, k, output_folder):
+    """Save all the matrices in folder (same files as apply_svd)"""
+    with open(output_folder + '/' + str(k) + '_sigma_vt.npy', 'wb') as f:
+        np.save(f, sigma_vt(sigma, vt))
+    with open(output_folder + '/' + str(k) + '_sigma.npy', 'wb') as f:
+        np.save(f, sigma)
+    with open(output_folder + '/' + str(k) + '_u.npy', 'wb') as f:
+        np.save(f, u)
+    with open(output_folder + '/' + str(k) + '_vt.npy', 'wb') as f:
+        np.save(f, vt)
@@ -0,0 +1,68 @@
+import os
+import sys
+import json
+import threading
+import urllib.error
+import urllib.request
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from embedding_service import make_server
+
+WORDS = ['noč', 'dan', 'vrata', 'okno', 'kralj', 'kraljica', 'moški', 'žena']
+
+
+@pytest.fixture
+def server(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / 'vectors.npy')
+    np.save(path, {word: rng.standard_normal(8).astype(np.float32) for word in WORDS})
+    # Long max_wait, so concurrent requests end up in the same batch
+    server = make_server({'cbow': path}, port=0, max_wait=0.2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, endpoint, body):
+    request = urllib.request.Request(f"{url}/{endpoint}", json.dumps(body).encode('utf-8'),
+                                     {'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize('topn', [10 ** 13, 0, -1, len(WORDS) + 1, '3', 2.5, True, None])
+def test_bad_topn(server, topn):
+    status, body = post(server, 'most_similar', {'words': ['noč'], 'topn': topn})
+    assert status == 400 and 'topn' in body['error']
+    status, body = post(server, 'analogy', {'queries': [{'positive': ['kralj']}], 'topn': topn})
+    assert status == 400 and 'topn' in body['error']
+
+
+def test_bad_query_does_not_fail_its_batch(server):
+    requests = {'bad': {'words': ['noč'], 'topn': 10 ** 13}, 'good': {'words': ['dan'], 'topn': 3}}
+    responses = {}
+    threads = [threading.Thread(target=lambda name=name, body=body: responses.update({name: post(server, 'most_similar', body)}))
+               for name, body in requests.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert responses['bad'][0] == 400
+    status, body = responses['good']
+    assert status == 200
+    assert len(body['results']['dan']) == 3
+    assert 'dan' not in [word for word, _ in body['results']['dan']]
+
+
+def test_malformed_words(server):
+    assert post(server, 'most_similar', {'words': 'noč'})[0] == 400
+    assert post(server, 'analogy', {'queries': [{'positive': []}]})[0] == 400
+    status, body = post(server, 'vectors', {'words': ['noč', 'neznana']})
+    assert status == 200 and body['vectors']['neznana'] is None and len(body['vectors']['noč']) == 8
@@ -0,0 +1,56 @@
+import numbers
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer
+
+
+def count_corpus(corpus_path, token_pattern=None):
+    '''
+    Count words of the corpus once, for all TF-IDF variants
+
+    corpus_path - is a path to the corpus, where one line - one text
+
+    token_pattern - alphabet, which will be considered (as in make_matrix_W_list_of_words)
+
+    Returns texts x words count matrix (CSR), words and document frequencies
+    '''
+    if token_pattern:
+        vectorizer = CountVectorizer(analyzer='word', token_pattern=token_pattern)
+    else:
+        vectorizer = CountVectorizer(analyzer='word')
+    with open(corpus_path, 'r', encoding='utf-8') as corpus_file:
+        counts = vectorizer.fit_transform(corpus_file)
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    return counts, vectorizer.get_feature_names_out(), document_frequency
+
+
+def tfidf_variant(counts, words, document_frequency, min_df=1, max_df=1.0, use_idf=True):
+    '''
+    Same matrix and words list as TfidfVectorizer(min_df=min_df, max_df=max_df, use_idf=use_idf),
+    made by slicing columns of the counts from count_corpus and reweighting them
+
+    min_df, max_df - minimum and maximum times (int) or fraction of the texts (float)
+    a word must occur in the corpus; max_df=None - there are no upper bound
+    '''
+    n_texts = counts.shape[0]
+    if max_df is None:
+        max_df = 1.0
+    min_count = min_df if isinstance(min_df, numbers.Integral) else min_df * n_texts
+    max_count = max_df if isinstance(max_df, numbers.Integral) else max_df * n_texts
+    if max_count < min_count:
+        raise ValueError("max_df corresponds to < documents than min_df")
+
+    columns = np.flatnonzero((document_frequency >= min_count) & (document_frequency <= max_count))
+    W = TfidfTransformer(use_idf=use_idf).fit_transform(counts[:, columns])
+    return W, words[columns]
+
+
+def tfidf_sweep(corpus_path, settings, token_pattern=None):
+    '''
+    Build TF-IDF matrices for a list of settings, counting the corpus only once
+
+    settings - list of dicts with min_df, max_df, use_idf (e.g. [{'min_df': 1}, {'min_df': 5}])
+
+    Returns list of (W, words_list) in the order of settings
+    '''
+    counts, words, document_frequency = count_corpus(corpus_path, token_pattern)
+    return [tfidf_variant(counts, words, document_frequency, **setting) for setting in settings]
@@ -0,0 +1,69 @@
+import os
+import classla
+
+
+def make_pipeline(batch_size=5000):
+    """Classla pipeline for pretokenized input (every word is one token)"""
+    return classla.Pipeline('sl', processors='tokenize,lemma,pos',
+                            tokenize_pretokenized=True,
+                            lemma_batch_size=batch_size,
+                            pos_batch_size=batch_size)
+
+
+def word_verdict(word, token):
+    """Returns False if CLASSLA doesn't know this word (same rules as is_valid_lemma)"""
+    if token.lemma is None:
+        return False
+
+    # When lemma matches input, verify CLASSLA actually knows it
+    if token.lemma.lower() == word.lower():
+        if token.feats is None:
+            return False  # is_valid_lemma failed on missing feats and returned False
+        return (
+            token.upos not in ['X', 'SYM', 'PUNCT'] and
+            'Foreign=Yes' not in token.feats and
+            'Typo=Yes' not in token.feats
+        )
+    return True
+
+
+def load_verdicts(cache_path):
+    """Load cached verdicts from TSV file (word, 1/0)"""
+    verdicts = {}
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                word, verdict = line.rstrip('\n').split('\t')
+                verdicts[word] = verdict == '1'
+    return verdicts
+
+
+def validate_words(words, nlp, cache_path='classla_verdicts.tsv', batch_size=5000):
+    '''
+    words - vocabulary to check (e.g. words_list of the TF-IDF matrix)
+
+    nlp - pipeline from make_pipeline(), it has to accept pretokenized input
+
+    cache_path - TSV file with verdicts of the words checked before,
+    only new words are sent to classla and appended to it
+
+    batch_size - number of words in one document sent to classla,
+    every word is a separate sentence, so words do not get context
+
+    Returns dictionary word -> bool
+    '''
+    verdicts = load_verdicts(cache_path)
+    new_words = [word for word in dict.fromkeys(words) if word not in verdicts]
+
+    with open(cache_path, 'a', encoding='utf-8') as cache:
+        for start in range(0, len(new_words), batch_size):
+            batch = new_words[start:start + batch_size]
+            doc = nlp([[word] for word in batch])
+
+            for word, sentence in zip(batch, doc.sentences):
+                verdict = word_verdict(word, sentence.words[0])
+                verdicts[word] = verdict
+                cache.write(f"{word}\t{int(verdict)}\n")
+            cache.flush()  # Keep finished batches if interrupted
+
+    return {word: verdicts[word] for word in words}
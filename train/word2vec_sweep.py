@@ -0,0 +1,150 @@
+import os
+import csv
+import json
+import time
+import hashlib
+import itertools
+from multiprocessing import Pool
+from gensim.models import Word2Vec
+
+from word2vec_training import corpus_arguments
+from evaluate_embeddings import GENDER_ANALOGIES, evaluate_analogies, evaluate_similarities, read_analogies, read_similarities
+from query_engine import QueryEngine
+
+# Vocabulary of the full corpus, shared by all trials of the current worker process
+raw_vocab = None
+corpus_count = None
+total_words = None
+
+
+def scan_vocabulary(corpus):
+    """Counts of all words of the corpus (one pass), number of texts and words"""
+    scanner = Word2Vec()
+    words, texts = scanner.scan_vocab(**corpus_arguments(corpus))
+    return dict(scanner.raw_vocab), texts, words
+
+
+def grid_configs(grid):
+    """{'min_count': [5, 10], 'window': [5]} -> [{'min_count': 5, 'window': 5}, {'min_count': 10, 'window': 5}]"""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def corpus_signature(corpus):
+    path = corpus if os.path.exists(corpus) else corpus + '.tokens.u32'
+    stat = os.stat(path)
+    return {'corpus': os.path.abspath(corpus), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def config_hash(config, signature):
+    """Same configuration on the same corpus file -> same hash (cached model is reused)"""
+    return hashlib.sha1(json.dumps({'config': config, **signature}, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def init_worker(vocab, texts, words):
+    global raw_vocab, corpus_count, total_words
+    raw_vocab, corpus_count, total_words = vocab, texts, words
+
+
+def evaluate_model(wv, analogy_files, similarity_files):
+    engine = QueryEngine.from_keyed_vectors(wv)
+    scores = {}
+    for path in analogy_files:
+        scores[os.path.basename(path) + ' accuracy'] = evaluate_analogies(engine, read_analogies(path))['accuracy']
+    for path in similarity_files:
+        scores[os.path.basename(path) + ' spearman'] = evaluate_similarities(engine, read_similarities(path))['spearman']
+    return scores
+
+
+def run_trial(task):
+    '''
+    Train one configuration with the vocabulary trimmed from the shared scan,
+    save model and its record to the cache folder
+
+    A failed trial (e.g. min_count leaving no vocabulary) returns its record with
+    the error and is not cached, so the other trials and the summary go on
+    '''
+    config, key, corpus, cache_dir, workers, analogy_files, similarity_files = task
+    model_path = os.path.join(cache_dir, key + '.model')
+    record_path = os.path.join(cache_dir, key + '.json')
+
+    start = time.time()
+    try:
+        model = Word2Vec(workers=workers, **config)
+        model.build_vocab_from_freq(raw_vocab, corpus_count=corpus_count)
+        model.corpus_total_words = total_words
+        model.train(**corpus_arguments(corpus), total_examples=corpus_count,
+                    total_words=total_words, epochs=model.epochs)
+        seconds = time.time() - start
+
+        record = {**config, 'hash': key, 'seconds': seconds, 'vocabulary': len(model.wv),
+                  **evaluate_model(model.wv, analogy_files, similarity_files)}
+    except Exception as e:
+        return {**config, 'hash': key, 'seconds': time.time() - start, 'error': f"{type(e).__name__}: {e}"}
+    model.save(model_path)
+    with open(record_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f)
+    return record
+
+
+def run_sweep(corpus, grid, cache_dir='word2vec_sweep', summary_file='sweep_summary.tsv',
+              cpu_budget=None, workers_per_trial=1,
+              analogy_files=(GENDER_ANALOGIES,), similarity_files=()):
+    '''
+    corpus - text corpus file (filtered_slovenian_corpus.txt) or prefix of a binary corpus
+
+    grid - dictionary parameter -> list of values for Word2Vec
+    (e.g. {'min_count': [1, 5, 10], 'window': [5, 10], 'epochs': [5], 'vector_size': [100]})
+
+    cpu_budget - cores for the whole sweep (None - all), trials run in parallel,
+    cpu_budget // workers_per_trial at a time
+
+    Models are cached in cache_dir by the hash of configuration and corpus,
+    finished trials are not trained again (failed ones are, their rows have
+    an error column). Returns rows of the summary table.
+    '''
+    os.makedirs(cache_dir, exist_ok=True)
+    signature = corpus_signature(corpus)
+    records = {}
+    tasks = []
+    for config in grid_configs(grid):
+        key = config_hash(config, signature)
+        record_path = os.path.join(cache_dir, key + '.json')
+        if os.path.exists(record_path) and os.path.exists(os.path.join(cache_dir, key + '.model')):
+            with open(record_path, 'r', encoding='utf-8') as f:
+                records[key] = json.load(f)
+        else:
+            tasks.append((config, key, corpus, cache_dir, workers_per_trial, analogy_files, similarity_files))
+    print(f"{len(records)} cached, {len(tasks)} to train")
+
+    if tasks:
+        start = time.time()
+        vocab, texts, words = scan_vocabulary(corpus)
+        print(f"Vocabulary scan: {len(vocab):,} words, {time.time() - start:.1f} s")
+
+        parallel = max(1, (cpu_budget or os.cpu_count()) // workers_per_trial)
+        with Pool(min(parallel, len(tasks)), initializer=init_worker, initargs=(vocab, texts, words)) as pool:
+            for record in pool.imap_unordered(run_trial, tasks):
+                records[record['hash']] = record
+                if 'error' in record:
+                    print(f"{record['hash']} failed: {record['error']}")
+                else:
+                    print(f"{record['hash']} {record['seconds']:.1f} s, {record['vocabulary']:,} words")
+
+    # Rows in the order of the grid
+    rows = [records[config_hash(config, signature)] for config in grid_configs(grid)]
+    fields = list(dict.fromkeys(field for row in rows for field in row))
+    with open(summary_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, delimiter='\t')
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def load_trial(cache_dir, key):
+    return Word2Vec.load(os.path.join(cache_dir, key + '.model'))
+
+
+if __name__ == '__main__':
+    run_sweep('filtered_slovenian_corpus.txt',
+              {'min_count': [1, 5, 10], 'window': [5, 10], 'epochs': [5, 10], 'vector_size': [100]})
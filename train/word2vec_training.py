@@ -0,0 +1,69 @@
+import os
+import sys
+import copy
+import time
+from gensim.models import Word2Vec
+
+# Binary corpus lives next to make_corpus.py
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'preprocessing'))
+from binary_corpus import TOKENS_SUFFIX, BinaryCorpusSentences
+
+# gensim trains on at most this many words of a sentence
+MAX_SENTENCE_LENGTH = 10000
+
+
+def corpus_arguments(corpus):
+    '''
+    corpus - text corpus file (one text per line, words separated by spaces,
+    e.g. filtered_slovenian_corpus.txt) or prefix of a binary corpus
+
+    Text files are streamed by gensim itself (corpus_file, every worker reads
+    its own part of the file), binary corpora through a restartable iterator
+    '''
+    if os.path.exists(corpus + TOKENS_SUFFIX):
+        return {'corpus_iterable': BinaryCorpusSentences(corpus, max_length=MAX_SENTENCE_LENGTH)}
+    return {'corpus_file': corpus}
+
+
+def train_word2vec(corpus, workers=None, **params):
+    '''
+    Same model as Word2Vec(sentences=load_corpus(...), **params) without the
+    corpus in memory (long texts are split into pieces of 10000 words
+    instead of being truncated)
+
+    workers - worker threads, None - all cores
+    '''
+    arguments = corpus_arguments(corpus)
+    if 'corpus_iterable' in arguments:
+        arguments = {'sentences': arguments['corpus_iterable']}  # Name in the constructor
+    return Word2Vec(workers=workers or os.cpu_count(), **arguments, **params)
+
+
+def benchmark_workers(corpus, worker_counts=None, epochs=1, **params):
+    '''
+    Training throughput in words/sec for every number of workers,
+    vocabulary is built once and the same untrained model is copied
+
+    Returns list of (workers, seconds, words_per_second)
+    '''
+    if worker_counts is None:
+        worker_counts = sorted({1, 2, 4, 8, os.cpu_count()} & set(range(1, os.cpu_count() + 1)))
+    arguments = corpus_arguments(corpus)
+    untrained = Word2Vec(epochs=epochs, **params)
+    untrained.build_vocab(**arguments)
+
+    results = []
+    for workers in worker_counts:
+        model = copy.deepcopy(untrained)
+        model.workers = workers
+        start = time.time()
+        _, raw_words = model.train(**arguments, total_examples=model.corpus_count,
+                                   total_words=model.corpus_total_words, epochs=epochs)
+        seconds = time.time() - start
+        results.append((workers, seconds, raw_words / seconds))
+        print(f"{workers} workers: {seconds:.1f} s, {raw_words / seconds:,.0f} words/s")
+    return results
+
+
+if __name__ == '__main__':
+    benchmark_workers('filtered_slovenian_corpus.txt', vector_size=100, min_count=10)